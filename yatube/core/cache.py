@@ -0,0 +1,181 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LocalLRU:
+    """Ограниченный по числу записей LRU-кеш в памяти процесса."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoTierCache(BaseCache):
+    """Локальный LRU процесса перед общим кешем.
+
+    В локальный уровень попадают только ключи с префиксами из
+    LOCAL_KEY_PREFIXES (по умолчанию фрагменты шаблонов): их ключи
+    содержат версию ленты, поэтому устаревшая копия в памяти одного
+    процесса не будет прочитана после изменения данных. Остальные ключи
+    (версии, счётчики) всегда читаются из общего кеша.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self.local_prefixes = tuple(
+            options.get('LOCAL_KEY_PREFIXES', ('template.cache.',))
+        )
+        name = location or self.shared_alias
+        with _stores_lock:
+            self.local = _stores.setdefault(
+                name, LocalLRU(options.get('LOCAL_MAX_ENTRIES', 256))
+            )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        if not key.startswith(self.local_prefixes):
+            return None
+        return self.make_key(key, version=version)
+
+    def _local_set(self, local_key, value, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            timeout = self.local_timeout
+        timeout = min(timeout, self.local_timeout)
+        if timeout > 0:
+            self.local.set(local_key, value, timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            value = self.local.get(local_key)
+            if value is not _MISSING:
+                return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        if local_key is not None:
+            self._local_set(local_key, value, DEFAULT_TIMEOUT)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self._local_set(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if added and local_key is not None:
+            self._local_set(local_key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self.local.delete(local_key)
+        self.shared.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = (
+                _MISSING if local_key is None else self.local.get(local_key)
+            )
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared_found = self.shared.get_many(missing, version=version)
+            for key, value in shared_found.items():
+                local_key = self._local_key(key, version)
+                if local_key is not None:
+                    self._local_set(local_key, value, DEFAULT_TIMEOUT)
+            found.update(shared_found)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            local_key = self._local_key(key, version)
+            if local_key is not None and key not in failed:
+                self._local_set(local_key, value, timeout)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            local_key = self._local_key(key, version)
+            if local_key is not None:
+                self.local.delete(local_key)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None and (
+            self.local.get(local_key) is not _MISSING
+        ):
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self._local_key(key, version)
+        if local_key is not None:
+            self.local.delete(local_key)
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
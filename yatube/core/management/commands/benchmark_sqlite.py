@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает одновременные чтения и записи в SQLite с настройками по '
+        'умолчанию и с SQLITE_PRAGMAS на временном файле базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=3.0)
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument(
+            '--output',
+            help='файл, куда сохранить результаты в JSON',
+        )
+
+    def handle(self, *args, **options):
+        modes = {
+            'default': sqlite.DEFAULT_PRAGMAS,
+            'configured': settings.SQLITE_PRAGMAS,
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, pragmas in modes.items():
+                results[mode] = sqlite.benchmark_concurrency(
+                    os.path.join(directory, f'{mode}.sqlite3'),
+                    pragmas,
+                    readers=options['readers'],
+                    writers=options['writers'],
+                    duration=options['duration'],
+                    rows=options['rows'],
+                )
+        for mode, kinds in results.items():
+            for kind, summary in kinds.items():
+                self.stdout.write(
+                    f'{mode:<10} {kind:<5} '
+                    f'{summary["per_second"]:>9} ops/s  '
+                    f'p50 {summary.get("p50_ms", "-"):>8} ms  '
+                    f'p99 {summary.get("p99_ms", "-"):>8} ms  '
+                    f'locked {summary["errors"]:>6}'
+                )
+        if options['output']:
+            report = {
+                'pragmas': modes,
+                'readers': options['readers'],
+                'writers': options['writers'],
+                'duration': options['duration'],
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
@@ -0,0 +1,260 @@
+"""Раздача загруженных файлов и статики без DEBUG.
+
+Файлы отдаются через FileResponse, а если перед Django стоит nginx или
+Apache, тело ответа можно переложить на них: MEDIA_SERVE_MODE
+'x-accel' добавляет заголовок X-Accel-Redirect с путём под
+MEDIA_ACCEL_REDIRECT_PREFIX, 'x-sendfile' — X-Sendfile с полным путём.
+Сильный ETag строится из SHA-256 содержимого: у файлов ContentHashStorage
+хеш уже записан в имени, у остальных он считается один раз и кешируется
+по размеру и времени изменения файла. Файлы с хешем в имени никогда не
+меняются и помечаются как immutable.
+
+Статика из STATIC_ROOT отдаётся так же, но вместо файла выбирается его
+предсжатая копия .br или .gz (см. core.staticfiles), если клиент её
+принимает; immutable получают имена с хешем от ManifestStaticFilesStorage.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from email.utils import formatdate
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.encoding import escape_uri_path
+from django.utils.http import quote_etag
+
+HASHED_NAME = re.compile(r'^[0-9a-f]{64}$')
+STATIC_HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^.]+$')
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+NOT_ACCEPTED = re.compile(r'^q=0(\.0*)?$')
+ETAG_KEY = 'media:etag:{digest}:{mtime}:{size}'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeFile:
+    """Файл, из которого читается только length байт начиная с offset.
+
+    У обёртки нет fileno(), поэтому WSGI-сервер не отдаст через sendfile
+    весь файл целиком, а будет читать его кусками через read().
+    """
+
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.remaining = length
+        file.seek(offset)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _resolve(root, path):
+    if not root:
+        raise Http404
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+def _is_hashed(path):
+    stem = posixpath.splitext(posixpath.basename(path))[0]
+    return bool(HASHED_NAME.match(stem))
+
+
+def _content_digest(full_path, stat):
+    key = ETAG_KEY.format(
+        digest=hashlib.sha1(full_path.encode()).hexdigest(),
+        mtime=stat.st_mtime_ns,
+        size=stat.st_size,
+    )
+    digest = cache.get(key)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with open(full_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        cache.set(key, digest, None)
+    return digest
+
+
+def get_etag(path, full_path, stat):
+    if _is_hashed(path):
+        digest = posixpath.splitext(posixpath.basename(path))[0]
+    else:
+        digest = _content_digest(full_path, stat)
+    return quote_etag(digest)
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = coding.partition(';')
+        if not NOT_ACCEPTED.match(params.replace(' ', '')):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _precompressed(request, full_path):
+    """Возвращает путь к лучшей принимаемой клиентом копии и её сжатие."""
+    accepted = _accepted_encodings(request)
+    for encoding, suffix in PRECOMPRESSED:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            return full_path + suffix, encoding
+    return full_path, None
+
+
+def parse_range(header, size):
+    """Возвращает (начало, конец) из заголовка Range или None.
+
+    Поддерживается один диапазон; на несколько диапазонов и
+    некорректный заголовок отдаётся весь файл, как разрешает RFC 7233.
+    Для недостижимого диапазона бросается ValueError.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if not length or not size:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError(header)
+    last = size - 1 if not last else min(int(last), size - 1)
+    return first, last
+
+
+def _requested_range(request, etag, size):
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        return None
+    return parse_range(header, size)
+
+
+def _content_type(full_path):
+    # Как и FileResponse, Content-Encoding не выставляется, чтобы браузер
+    # не распаковывал архивы: .gz отдаётся как application/octet-stream.
+    content_type, encoding = mimetypes.guess_type(full_path)
+    if encoding:
+        return 'application/octet-stream'
+    return content_type or 'application/octet-stream'
+
+
+def _offload(full_path, path):
+    response = HttpResponse(content_type=_content_type(full_path))
+    if settings.MEDIA_SERVE_MODE == 'x-accel':
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+        response['X-Accel-Redirect'] = escape_uri_path(
+            prefix.rstrip('/') + '/' + path
+        )
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def _file_response(request, full_path, etag, size, content_type):
+    try:
+        byte_range = _requested_range(request, etag, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(
+            open(full_path, 'rb'), content_type=content_type
+        )
+    first, last = byte_range
+    length = last - first + 1
+    response = FileResponse(
+        RangeFile(open(full_path, 'rb'), first, length),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    return response
+
+
+def _set_cache_headers(response, etag, stat, cache_control):
+    response['ETag'] = etag
+    response['Last-Modified'] = formatdate(stat.st_mtime, usegmt=True)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+
+
+def serve(request, path):
+    """Отдаёт файл MEDIA_ROOT/path с поддержкой Range и условных GET."""
+    full_path = _resolve(settings.MEDIA_ROOT, path)
+    stat = os.stat(full_path)
+    etag = get_etag(path, full_path, stat)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if settings.MEDIA_SERVE_MODE in ('x-accel', 'x-sendfile'):
+            response = _offload(full_path, path)
+        else:
+            response = _file_response(
+                request, full_path, etag, stat.st_size,
+                _content_type(full_path),
+            )
+    _set_cache_headers(
+        response, etag, stat,
+        IMMUTABLE if _is_hashed(path)
+        else f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+    )
+    return response
+
+
+def serve_static(request, path):
+    """Отдаёт STATIC_ROOT/path, выбирая предсжатую копию по Accept-Encoding.
+
+    У каждой копии свой ETag из хеша её содержимого: это разные
+    представления одного ресурса.
+    """
+    full_path = _resolve(settings.STATIC_ROOT, path)
+    body_path, encoding = _precompressed(request, full_path)
+    stat = os.stat(body_path)
+    etag = quote_etag(_content_digest(body_path, stat))
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = _file_response(
+            request, body_path, etag, stat.st_size, _content_type(full_path)
+        )
+        if encoding and response.status_code != 416:
+            response['Content-Encoding'] = encoding
+    _set_cache_headers(
+        response, etag, stat,
+        IMMUTABLE if STATIC_HASHED_NAME.search(path)
+        else f'public, max-age={settings.STATIC_CACHE_MAX_AGE}',
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
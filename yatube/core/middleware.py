@@ -0,0 +1,33 @@
+from django.conf import settings
+
+from .routers import read_from_replicas
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет чтения безопасных запросов на реплики.
+
+    Запросы с cookie закрепления читают из основной базы; cookie
+    ставится, если во время запроса была запись.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        use_replicas = (
+            request.method in SAFE_METHODS
+            and settings.DATABASE_PIN_COOKIE not in request.COOKIES
+        )
+        with read_from_replicas(use_replicas) as routing:
+            response = self.get_response(request)
+        if routing.wrote:
+            response.set_cookie(
+                settings.DATABASE_PIN_COOKIE,
+                '1',
+                max_age=settings.DATABASE_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,71 @@
+"""Чтение с реплик для безопасных запросов.
+
+ReplicaRoutingMiddleware разрешает читать с реплик из DATABASE_REPLICAS
+только на время GET/HEAD-запросов; команды, сигналы вне запросов и
+фоновые потоки работают с основной базой. После первой записи запрос
+читает из основной базы, а браузер получает cookie DATABASE_PIN_COOKIE
+на DATABASE_PIN_SECONDS: за это время реплики догоняют основную базу,
+а пользователь сразу видит свой пост или комментарий. Код, который
+кладёт прочитанное в кеш, может вызвать pin_to_primary(), если данные
+изменились недавно и реплика могла ещё не догнать основную базу.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+_routing = ContextVar('database_routing', default=None)
+
+
+class Routing:
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    """Разрешает чтение с реплик внутри блока, пока не было записи."""
+    routing = Routing(enabled)
+    token = _routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _routing.reset(token)
+
+
+def pin_to_primary():
+    """До конца текущего блока читать из основной базы."""
+    routing = _routing.get()
+    if routing is not None:
+        routing.use_replicas = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            routing is None
+            or not routing.use_replicas
+            or routing.wrote
+            or not replicas
+        ):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики через репликацию.
+        return db == PRIMARY
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .sqlite import apply_pragmas
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    if connection.is_in_memory_db():
+        # У базы в памяти нет журнала на диске, а mmap не применяется.
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+@receiver(request_started)
+def check_database_connections(sender, **kwargs):
+    """Закрывает оборвавшиеся постоянные соединения перед запросом.
+
+    Django закрывает соединение с истёкшим CONN_MAX_AGE или после ошибки,
+    но не замечает разрыв со стороны сервера базы или pgbouncer. Если
+    включён CONN_HEALTH_CHECKS, открытое соединение проверяется, и
+    запрос сразу откроет новое вместо ошибки на первом SQL-запросе.
+    """
+    for connection in connections.all():
+        if (
+            connection.settings_dict.get('CONN_HEALTH_CHECKS')
+            and connection.connection is not None
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
@@ -0,0 +1,152 @@
+"""Настройка соединений SQLite и замер конкурентного доступа.
+
+В режиме WAL читатели не блокируются писателем, а busy_timeout
+заставляет писателей ждать освобождения блокировки вместо немедленной
+ошибки "database is locked". PRAGMA из SQLITE_PRAGMAS выполняются на
+каждом новом соединении обработчиком из core.signals (journal_mode=WAL
+сохраняется в файле базы, остальные действуют в рамках соединения).
+"""
+import re
+import sqlite3
+import statistics
+import threading
+import time
+
+PRAGMA_VALUE = re.compile(r'^(-?\d+|[A-Za-z]+)$')
+# Как работает Django без SQLITE_PRAGMAS: журнал отката и ожидание
+# блокировки 5 секунд (timeout модуля sqlite3 по умолчанию).
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+}
+
+
+def pragma_statements(pragmas):
+    statements = []
+    for name, value in pragmas.items():
+        if not name.isidentifier() or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f'Некорректная PRAGMA {name} = {value}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(cursor, pragmas):
+    """Выполняет PRAGMA; busy_timeout первым, чтобы смена журнала ждала."""
+    pragmas = dict(pragmas)
+    if 'busy_timeout' in pragmas:
+        pragmas = {'busy_timeout': pragmas.pop('busy_timeout'), **pragmas}
+    for statement in pragma_statements(pragmas):
+        cursor.execute(statement)
+
+
+def _connect(path, pragmas):
+    # Ожидание блокировки задаётся только через busy_timeout из pragmas.
+    connection = sqlite3.connect(
+        path, timeout=0, isolation_level=None, check_same_thread=False
+    )
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+def _prepare(path, pragmas, rows):
+    connection = _connect(path, pragmas)
+    connection.executescript(
+        'CREATE TABLE IF NOT EXISTS feed ('
+        ' id INTEGER PRIMARY KEY, author_id INTEGER, pub_date REAL,'
+        ' text TEXT);'
+        'CREATE INDEX IF NOT EXISTS feed_author_pub_date'
+        ' ON feed (author_id, pub_date DESC);'
+    )
+    connection.executemany(
+        'INSERT INTO feed (author_id, pub_date, text) VALUES (?, ?, ?)',
+        ((number % 50, time.time(), 'x' * 200) for number in range(rows)),
+    )
+    connection.close()
+
+
+def _worker(path, pragmas, operation, deadline, stats, lock):
+    connection = _connect(path, pragmas)
+    latencies, errors = [], 0
+    number = 0
+    while time.perf_counter() < deadline:
+        number += 1
+        started = time.perf_counter()
+        try:
+            operation(connection, number)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    with lock:
+        stats['latencies'].extend(latencies)
+        stats['errors'] += errors
+
+
+def _read(connection, number):
+    connection.execute(
+        'SELECT id, text FROM feed WHERE author_id = ?'
+        ' ORDER BY pub_date DESC LIMIT 10',
+        (number % 50,),
+    ).fetchall()
+
+
+def _write(connection, number):
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(
+            'INSERT INTO feed (author_id, pub_date, text) VALUES (?, ?, ?)',
+            (number % 50, time.time(), 'x' * 200),
+        )
+    except sqlite3.Error:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def _summary(stats, duration):
+    latencies = sorted(stats['latencies'])
+    if not latencies:
+        return {'ops': 0, 'per_second': 0, 'errors': stats['errors']}
+    return {
+        'ops': len(latencies),
+        'per_second': round(len(latencies) / duration, 1),
+        'errors': stats['errors'],
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(
+            latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 3
+        ),
+    }
+
+
+def benchmark_concurrency(path, pragmas, readers=4, writers=2, duration=3.0,
+                          rows=5000):
+    """Одновременно читает и пишет в файл базы path заданное время.
+
+    Каждый поток работает через своё соединение с PRAGMA из pragmas.
+    Возвращает для читателей и писателей число операций в секунду,
+    процентили задержки и число ошибок "database is locked".
+    """
+    _prepare(path, pragmas, rows)
+    lock = threading.Lock()
+    stats = {
+        'read': {'latencies': [], 'errors': 0},
+        'write': {'latencies': [], 'errors': 0},
+    }
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(path, pragmas, operation, deadline, stats[kind], lock),
+        )
+        for kind, operation, count in (
+            ('read', _read, readers), ('write', _write, writers)
+        )
+        for _ in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {kind: _summary(stats[kind], duration) for kind in stats}
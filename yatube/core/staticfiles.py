@@ -0,0 +1,63 @@
+"""Хранилище статики с хешами в именах и предсжатыми копиями.
+
+collectstatic кладёт в STATIC_ROOT файлы вида bootstrap.min.<md5>.css,
+а рядом с текстовыми файлами — сжатые при сборке .gz и, если установлен
+пакет brotli, .br. core.media.serve_static выбирает из них копию по
+Accept-Encoding, поэтому сжимать статику на каждый запрос не нужно.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = frozenset((
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico',
+    '.webmanifest',
+))
+# Выигрыш на маленьких файлах меньше накладных расходов на заголовки.
+MIN_COMPRESS_SIZE = 256
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def compressors(self):
+        yield '.gz', _gzip
+        if brotli is not None:
+            yield '.br', _brotli
+
+    def compress(self, name):
+        """Сохраняет сжатые копии файла, если они меньше исходного."""
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compressor in self.compressors():
+            compressed = compressor(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if self.exists(name):
+                self.compress(name)
@@ -0,0 +1,42 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище, которое называет файлы по SHA-256 их содержимого.
+
+    Файл posts/Photo.JPG сохраняется как posts/ab/cd/abcd<...>.jpg:
+    одинаковые загрузки попадают в один файл (и получают общие
+    миниатюры), а два уровня подкаталогов ограничивают число файлов в
+    каталоге. Один файл может принадлежать нескольким объектам, поэтому
+    удалять его вместе с объектом нельзя.
+    """
+
+    chunk_size = 64 * 1024
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(self.chunk_size):
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, basename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(basename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
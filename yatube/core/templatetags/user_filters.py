@@ -6,3 +6,10 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def page_window(page, on_each_side=2):
+    first = max(page.number - on_each_side, 1)
+    last = min(page.number + on_each_side, page.paginator.num_pages)
+    return range(first, last + 1)
@@ -0,0 +1,109 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import LocalLRU
+from ..env import cache_from_url
+
+TWO_TIER_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'two_tier': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': 'core-tests',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'LOCAL_MAX_ENTRIES': 2,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'core-tests-shared',
+    },
+}
+
+
+class CacheFromUrlTest(SimpleTestCase):
+    def test_backends(self):
+        """URL кеша превращается в настройки нужного backend."""
+        cases = {
+            'locmem://': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'file:///var/tmp/yatube': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': '/var/tmp/yatube',
+            },
+            'memcached://10.0.0.1:11211,10.0.0.2:11211?timeout=600': {
+                'BACKEND':
+                    'django.core.cache.backends.memcached.MemcachedCache',
+                'LOCATION': ['10.0.0.1:11211', '10.0.0.2:11211'],
+                'TIMEOUT': 600,
+            },
+            'redis://cache:6379/1?key_prefix=yatube': {
+                'BACKEND': 'django_redis.cache.RedisCache',
+                'LOCATION': 'redis://cache:6379/1',
+                'KEY_PREFIX': 'yatube',
+            },
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(cache_from_url(url), expected)
+
+    def test_unknown_scheme(self):
+        """Неизвестная схема URL кеша вызывает ошибку."""
+        with self.assertRaises(ValueError):
+            cache_from_url('mongo://localhost')
+
+
+@override_settings(CACHES=TWO_TIER_CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['two_tier']
+        self.shared = caches['shared']
+        self.cache.clear()
+
+    def test_fragments_served_from_local_tier(self):
+        """Фрагменты шаблонов читаются из памяти процесса."""
+        self.cache.set('template.cache.index_page.1', 'html')
+        self.shared.clear()
+        self.assertEqual(self.cache.get('template.cache.index_page.1'), 'html')
+
+    def test_other_keys_read_from_shared(self):
+        """Остальные ключи всегда читаются из общего кеша."""
+        self.cache.set('posts:version:index', 'v1')
+        self.shared.set('posts:version:index', 'v2')
+        self.assertEqual(self.cache.get('posts:version:index'), 'v2')
+
+    def test_read_through_fills_local_tier(self):
+        """Промах локального уровня заполняется из общего кеша."""
+        self.shared.set('template.cache.group_page.1', 'html')
+        self.assertEqual(self.cache.get('template.cache.group_page.1'), 'html')
+        self.shared.clear()
+        self.assertEqual(self.cache.get('template.cache.group_page.1'), 'html')
+
+    def test_delete_clears_both_tiers(self):
+        """Удаление убирает ключ из обоих уровней."""
+        self.cache.set('template.cache.profile_page.1', 'html')
+        self.cache.delete('template.cache.profile_page.1')
+        self.assertIsNone(self.cache.get('template.cache.profile_page.1'))
+
+
+class LocalLRUTest(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        """Из переполненного LRU вытесняется давно не читанная запись."""
+        lru = LocalLRU(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b', None))
+        self.assertEqual(len(lru), 2)
+
+    def test_expired_entries_are_misses(self):
+        """Просроченная запись не возвращается."""
+        lru = LocalLRU(max_entries=2)
+        lru.set('a', 1, -1)
+        self.assertIsNone(lru.get('a', None))
@@ -0,0 +1,88 @@
+import os
+from unittest import mock
+
+from django.core.signals import request_started
+from django.test import SimpleTestCase
+
+from ..env import database_from_url, databases_from_env
+
+
+class DatabaseFromUrlTest(SimpleTestCase):
+    def test_urls(self):
+        """URL базы превращается в настройки нужного backend."""
+        cases = {
+            'sqlite:////var/lib/yatube/db.sqlite3': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': '/var/lib/yatube/db.sqlite3',
+            },
+            'sqlite://:memory:': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+            },
+            'postgres://yatube:p%40ss@db:5433/yatube?sslmode=require': {
+                'ENGINE': 'django.db.backends.postgresql',
+                'NAME': 'yatube',
+                'USER': 'yatube',
+                'PASSWORD': 'p@ss',
+                'HOST': 'db',
+                'PORT': '5433',
+                'OPTIONS': {'sslmode': 'require'},
+            },
+            'postgresql://pgbouncer/yatube?pool=pgbouncer'
+            '&conn_max_age=none&health_checks=false': {
+                'ENGINE': 'django.db.backends.postgresql',
+                'NAME': 'yatube',
+                'USER': '',
+                'PASSWORD': '',
+                'HOST': 'pgbouncer',
+                'PORT': '',
+                'CONN_MAX_AGE': None,
+                'CONN_HEALTH_CHECKS': False,
+                'DISABLE_SERVER_SIDE_CURSORS': True,
+            },
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(database_from_url(url), expected)
+
+    def test_unknown_url(self):
+        """Неизвестная схема или режим пула вызывают ошибку."""
+        for url in ('mysql://db/yatube', 'postgres://db/yatube?pool=odd'):
+            with self.subTest(url=url):
+                with self.assertRaises(ValueError):
+                    database_from_url(url)
+
+    def test_persistent_connections_from_env(self):
+        """Постоянные соединения и проверки включены по умолчанию."""
+        with mock.patch.dict(os.environ, {
+            'DATABASE_URL': 'postgres://db/yatube',
+            'DATABASE_CONN_MAX_AGE': '300',
+        }):
+            default = databases_from_env('sqlite://:memory:')['default']
+        self.assertEqual(default['NAME'], 'yatube')
+        self.assertEqual(default['CONN_MAX_AGE'], 300)
+        self.assertTrue(default['CONN_HEALTH_CHECKS'])
+
+
+class ConnectionHealthCheckTest(SimpleTestCase):
+    def fake_connection(self, usable, health_checks=True):
+        connection = mock.Mock(
+            settings_dict={'CONN_HEALTH_CHECKS': health_checks},
+            in_atomic_block=False,
+        )
+        connection.is_usable.return_value = usable
+        return connection
+
+    def test_broken_connection_closed(self):
+        """Оборвавшееся соединение закрывается в начале запроса."""
+        broken = self.fake_connection(usable=False)
+        alive = self.fake_connection(usable=True)
+        unchecked = self.fake_connection(usable=False, health_checks=False)
+        with mock.patch(
+            'core.signals.connections.all',
+            return_value=[broken, alive, unchecked],
+        ):
+            request_started.send(sender=self.__class__)
+        broken.close.assert_called_once_with()
+        alive.close.assert_not_called()
+        unchecked.is_usable.assert_not_called()
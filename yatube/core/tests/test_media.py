@@ -0,0 +1,138 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+
+from .. import media
+
+CONTENT = b'0123456789abcdef'
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+HASHED_PATH = f'posts/{DIGEST[:2]}/{DIGEST[2:4]}/{DIGEST}.jpg'
+PLAIN_PATH = 'cache/ab/cd/thumb.jpg'
+
+
+class MediaServeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_SERVE_MODE='django'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for path in (HASHED_PATH, PLAIN_PATH):
+            full_path = os.path.join(self.media_root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as file:
+                file.write(CONTENT)
+        self.factory = RequestFactory()
+
+    def serve(self, path, **headers):
+        response = media.serve(self.factory.get('/media/' + path, **headers),
+                               path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с сильным ETag из хеша содержимого."""
+        response = self.serve(HASHED_PATH)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['ETag'], f'"{DIGEST}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('Last-Modified', response)
+
+    def test_cache_control(self):
+        """Файлы с хешем в имени кешируются навсегда, остальные на сутки."""
+        self.assertEqual(
+            self.serve(HASHED_PATH)['Cache-Control'],
+            'public, max-age=31536000, immutable',
+        )
+        self.assertEqual(
+            self.serve(PLAIN_PATH)['Cache-Control'], 'public, max-age=86400'
+        )
+
+    def test_plain_name_etag_from_content(self):
+        """ETag файла без хеша в имени тоже строится из содержимого."""
+        self.assertEqual(self.serve(PLAIN_PATH)['ETag'], f'"{DIGEST}"')
+
+    def test_not_modified(self):
+        """По совпадающему If-None-Match отдаётся 304 без тела."""
+        response = self.serve(HASHED_PATH, HTTP_IF_NONE_MATCH=f'"{DIGEST}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], f'"{DIGEST}"')
+
+    def test_byte_ranges(self):
+        """Запрос Range отдаёт 206 с нужным куском файла."""
+        cases = (
+            ('bytes=2-5', b'2345', 'bytes 2-5/16'),
+            ('bytes=10-', b'abcdef', 'bytes 10-15/16'),
+            ('bytes=-3', b'def', 'bytes 13-15/16'),
+            ('bytes=12-100', b'cdef', 'bytes 12-15/16'),
+        )
+        for header, content, content_range in cases:
+            with self.subTest(header=header):
+                response = self.serve(HASHED_PATH, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b''.join(response.streaming_content), content
+                )
+                self.assertEqual(response['Content-Length'],
+                                 str(len(content)))
+                self.assertEqual(response['Content-Range'], content_range)
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла даёт 416."""
+        response = self.serve(HASHED_PATH, HTTP_RANGE='bytes=16-20')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */16')
+
+    def test_ignored_ranges(self):
+        """Несколько диапазонов и устаревший If-Range дают весь файл."""
+        cases = (
+            {'HTTP_RANGE': 'bytes=0-1,4-5'},
+            {'HTTP_RANGE': 'bytes=5-2'},
+            {'HTTP_RANGE': 'bytes=0-1', 'HTTP_IF_RANGE': '"stale"'},
+        )
+        for headers in cases:
+            with self.subTest(headers=headers):
+                response = self.serve(HASHED_PATH, **headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    b''.join(response.streaming_content), CONTENT
+                )
+
+    def test_missing_and_outside_files(self):
+        """Несуществующие файлы и пути вне MEDIA_ROOT дают 404."""
+        for path in ('posts/missing.jpg', '../secret.txt', 'posts'):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    self.serve(path)
+
+    def test_offload(self):
+        """В режимах x-accel и x-sendfile тело отдаёт веб-сервер."""
+        with self.settings(MEDIA_SERVE_MODE='x-accel',
+                           MEDIA_ACCEL_REDIRECT_PREFIX='/protected/'):
+            response = self.serve(HASHED_PATH)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected/{HASHED_PATH}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], f'"{DIGEST}"')
+        with self.settings(MEDIA_SERVE_MODE='x-sendfile'):
+            response = self.serve(HASHED_PATH)
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(self.media_root, HASHED_PATH))
+
+    def test_url(self):
+        """Без DEBUG файлы доступны по MEDIA_URL."""
+        response = self.client.get('/media/' + HASHED_PATH)
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
@@ -0,0 +1,98 @@
+import os
+from unittest import mock
+
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from posts.models import Post
+
+from ..env import databases_from_env
+from ..middleware import ReplicaRoutingMiddleware
+from ..routers import pin_to_primary, read_from_replicas
+
+
+@override_settings(DATABASE_REPLICAS=('replica_1',))
+class ReplicaRouterTest(SimpleTestCase):
+    def test_primary_outside_requests(self):
+        """Вне запросов чтения идут в основную базу."""
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_replica_until_write(self):
+        """Внутри блока чтения идут на реплику до первой записи."""
+        with read_from_replicas() as routing:
+            self.assertEqual(router.db_for_read(Post), 'replica_1')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertTrue(routing.wrote)
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_pin_to_primary(self):
+        """После pin_to_primary блок читает из основной базы."""
+        with read_from_replicas():
+            pin_to_primary()
+            self.assertEqual(router.db_for_read(Post), 'default')
+        pin_to_primary()
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=())
+    def test_without_replicas(self):
+        """Без реплик всё читается из основной базы."""
+        with read_from_replicas():
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_migrations_only_on_primary(self):
+        """Миграции применяются только к основной базе."""
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica_1', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=('replica_1',))
+class ReplicaRoutingMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.read_from = None
+
+    def view(self, write=False):
+        def get_response(request):
+            if write:
+                router.db_for_write(Post)
+            self.read_from = router.db_for_read(Post)
+            return HttpResponse()
+        return ReplicaRoutingMiddleware(get_response)
+
+    def test_get_reads_from_replica(self):
+        """GET-запрос читает с реплики и не закрепляется."""
+        response = self.view()(self.factory.get('/'))
+        self.assertEqual(self.read_from, 'replica_1')
+        self.assertNotIn('db_primary', response.cookies)
+
+    def test_write_pins_to_primary(self):
+        """После записи браузер закрепляется за основной базой."""
+        response = self.view(write=True)(self.factory.post('/'))
+        self.assertEqual(self.read_from, 'default')
+        cookie = response.cookies['db_primary']
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertTrue(cookie['httponly'])
+
+    def test_pinned_reads_from_primary(self):
+        """С cookie закрепления GET-запрос читает основную базу."""
+        request = self.factory.get('/')
+        request.COOKIES['db_primary'] = '1'
+        self.view()(request)
+        self.assertEqual(self.read_from, 'default')
+
+    def test_replicas_from_env(self):
+        """Реплики из окружения зеркалят основную базу в тестах."""
+        with mock.patch.dict(os.environ, {
+            'DATABASE_URL': 'sqlite:////tmp/primary.sqlite3',
+            'DATABASE_REPLICA_URLS': (
+                'sqlite:////tmp/replica.sqlite3,postgres://replica/yatube'
+            ),
+        }):
+            databases = databases_from_env('sqlite://:memory:')
+        self.assertEqual(
+            list(databases), ['default', 'replica_1', 'replica_2']
+        )
+        self.assertEqual(
+            databases['replica_1']['NAME'], '/tmp/replica.sqlite3'
+        )
+        self.assertEqual(databases['replica_2']['TEST'], {'MIRROR': 'default'})
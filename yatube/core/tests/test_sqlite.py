@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from .. import sqlite
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 1234,
+    'mmap_size': 1024 * 1024,
+    'cache_size': -2048,
+}
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=PRAGMAS)
+    def test_new_connection_configured(self):
+        """Новое соединение с файлом базы получает PRAGMA из настроек."""
+        settings_dict = dict(
+            connection.settings_dict,
+            NAME=os.path.join(self.directory, 'db.sqlite3'),
+        )
+        wrapper = DatabaseWrapper(settings_dict, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+        self.assertEqual(self.pragma(wrapper, 'mmap_size'), 1024 * 1024)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -2048)
+
+    def test_invalid_pragma_rejected(self):
+        """Значения PRAGMA проверяются перед подстановкой в SQL."""
+        for pragmas in ({'journal_mode': 'wal; DROP'}, {'bad name': 1}):
+            with self.subTest(pragmas=pragmas):
+                with self.assertRaises(ValueError):
+                    sqlite.pragma_statements(pragmas)
+
+    def test_benchmark_concurrency(self):
+        """В режиме WAL чтения и записи идут одновременно без ошибок."""
+        results = sqlite.benchmark_concurrency(
+            os.path.join(self.directory, 'bench.sqlite3'),
+            PRAGMAS,
+            readers=2,
+            writers=1,
+            duration=0.3,
+            rows=100,
+        )
+        for kind in ('read', 'write'):
+            self.assertGreater(results[kind]['ops'], 0)
+            self.assertEqual(results[kind]['errors'], 0)
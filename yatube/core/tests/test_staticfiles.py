@@ -0,0 +1,93 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import media
+
+CSS = b'body { color: #333; }\n' * 40
+
+
+class CompressedManifestStorageTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        for directory in (source, self.static_root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as file:
+            file.write(CSS)
+        with open(os.path.join(source, 'css', 'tiny.css'), 'wb') as file:
+            file.write(b'a{}')
+        settings_override = override_settings(
+            STATIC_ROOT=self.static_root,
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed_name = staticfiles_storage.stored_name('css/site.css')
+        self.factory = RequestFactory()
+
+    def serve(self, path, **headers):
+        response = media.serve_static(
+            self.factory.get('/static/' + path, **headers), path
+        )
+        self.addCleanup(response.close)
+        return response
+
+    def test_hashed_and_compressed_copies(self):
+        """collectstatic пишет имена с хешем и сжатые копии."""
+        self.assertRegex(self.hashed_name, r'^css/site\.[0-9a-f]{12}\.css$')
+        full_path = os.path.join(self.static_root, self.hashed_name)
+        with open(full_path + '.gz', 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), CSS)
+        tiny = staticfiles_storage.stored_name('css/tiny.css')
+        self.assertFalse(
+            os.path.exists(os.path.join(self.static_root, tiny + '.gz'))
+        )
+
+    def test_serves_precompressed_copy(self):
+        """Клиент с gzip получает сжатую копию и immutable-кеширование."""
+        response = self.serve(self.hashed_name, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            response['Cache-Control'], 'public, max-age=31536000, immutable'
+        )
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), CSS
+        )
+
+    def test_serves_identity_copy(self):
+        """Без поддержки gzip отдаётся исходный файл со своим ETag."""
+        compressed = self.serve(
+            self.hashed_name, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        for accept_encoding in ('', 'gzip;q=0, identity'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.serve(
+                    self.hashed_name, HTTP_ACCEPT_ENCODING=accept_encoding
+                )
+                self.assertNotIn('Content-Encoding', response)
+                self.assertEqual(b''.join(response.streaming_content), CSS)
+                self.assertNotEqual(response['ETag'], compressed['ETag'])
+
+    def test_unhashed_name_short_cache(self):
+        """Имя без хеша кешируется ненадолго."""
+        response = self.serve('css/site.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
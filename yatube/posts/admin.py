@@ -1,9 +1,28 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class IndexedSearchMixin:
+    """Поиск в админке по полнотекстовому индексу вместо LIKE.
+
+    search_fields нужны только чтобы админка показала поле поиска; если
+    для базы нет индекса, работает стандартный поиск по ним.
+    """
+
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = search.matching_ids(search_term, self.search_kind)
+        if ids is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=ids), False
+
+
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -13,6 +32,7 @@ class PostAdmin(admin.ModelAdmin):
     )
     list_editable = ('group',)
     search_fields = ('text',)
+    search_kind = search.POST
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
@@ -28,7 +48,7 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -37,6 +57,7 @@ class CommentAdmin(admin.ModelAdmin):
         'created',
     )
     search_fields = ('text',)
+    search_kind = search.COMMENT
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
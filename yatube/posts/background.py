@@ -0,0 +1,47 @@
+"""Пул потоков для работы, которую не нужно делать в потоке запроса.
+
+Задачи ставятся в пул после коммита транзакции: построение миниатюр
+картинок и раскладка постов по лентам подписок. Каждая задача сама
+ловит и логирует свои исключения.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_BACKGROUND_WORKERS,
+                thread_name_prefix='background',
+            )
+    return _executor
+
+
+def _run(func, args):
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def _run_inline():
+    # Тестовая база SQLite в памяти одна на процесс: фоновый поток
+    # конкурировал бы за неё с очисткой базы между тестами.
+    return not settings.POSTS_BACKGROUND_WORKERS or (
+        connection.vendor == 'sqlite' and connection.is_in_memory_db()
+    )
+
+
+def submit(func, *args):
+    """Выполняет func(*args) в пуле или сразу, если пул выключен."""
+    if _run_inline():
+        return func(*args)
+    return _get_executor().submit(_run, func, args)
@@ -0,0 +1,248 @@
+"""Замеры скорости страниц posts через тестовый клиент Django.
+
+Каждая страница запрашивается заданное число раз, для неё считаются
+процентили задержки, число SQL-запросов и время рендеринга шаблонов.
+Данные генерируются sample_data.seed_posts во временной базе, поэтому
+замеры можно запускать без подготовленной базы и сравнивать между
+коммитами по сохранённому JSON.
+
+compare_indexes() показывает, как составные индексы лент меняют планы
+и время запросов, которые выполняют представления: индексы временно
+удаляются, запросы замеряются без них и с ними.
+"""
+import math
+import statistics
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.template.backends.django import Template
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from .models import Comment, Follow, Post
+from .sample_data import seed_posts
+from .views import SHOW_POSTS_COUNT
+
+INDEXED_MODELS = (Post, Comment, Follow)
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def summarize(latencies, queries, render_times):
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / total, 1) if total else None,
+        'latency_ms': {
+            'mean': _milliseconds(statistics.mean(latencies)),
+            'p50': _milliseconds(percentile(latencies, 50)),
+            'p90': _milliseconds(percentile(latencies, 90)),
+            'p99': _milliseconds(percentile(latencies, 99)),
+            'max': _milliseconds(max(latencies)),
+        },
+        'queries': {
+            'mean': round(statistics.mean(queries), 2),
+            'max': max(queries),
+        },
+        'render_ms': {
+            'mean': _milliseconds(statistics.mean(render_times)),
+            'p50': _milliseconds(percentile(render_times, 50)),
+        },
+    }
+
+
+class RenderTimer:
+    """Суммирует время рендеринга шаблонов, вызванных через render()."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    @contextmanager
+    def patch(self):
+        original = Template.render
+
+        @wraps(original)
+        def timed_render(template, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(template, *args, **kwargs)
+            finally:
+                self.elapsed += time.perf_counter() - started
+
+        Template.render = timed_render
+        try:
+            yield self
+        finally:
+            Template.render = original
+
+
+def measure(client, url, requests, cold=False, warmup=2):
+    """Запрашивает url requests раз и возвращает сводку замеров."""
+    for _ in range(warmup):
+        client.get(url)
+    latencies, queries, render_times = [], [], []
+    timer = RenderTimer()
+    with timer.patch():
+        for _ in range(requests):
+            if cold:
+                cache.clear()
+            timer.elapsed = 0.0
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise AssertionError(f'{url}: {response.status_code}')
+            queries.append(len(captured))
+            render_times.append(timer.elapsed)
+    return summarize(latencies, queries, render_times)
+
+
+def pages(reader, post):
+    """Страницы для замеров: имя, url и нужна ли авторизация."""
+    return (
+        ('index', reverse('posts:index'), False),
+        (
+            'group_posts',
+            reverse('posts:group_list', kwargs={'slug': post.group.slug}),
+            False,
+        ),
+        (
+            'profile',
+            reverse(
+                'posts:profile', kwargs={'username': post.author.username}
+            ),
+            False,
+        ),
+        (
+            'post_detail',
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            False,
+        ),
+        ('follow_index', reverse('posts:follow_index'), True),
+    )
+
+
+def run(requests=100, cold=False, **sizes):
+    """Наполняет базу и замеряет страницы для гостя и читателя.
+
+    sizes передаются в seed_posts. Возвращает словарь
+    {страница: {клиент: сводка}}.
+    """
+    reader, post = seed_posts(**sizes)
+    clients = {'guest': Client(), 'reader': Client()}
+    clients['reader'].force_login(reader)
+    results = {}
+    for name, url, login_required in pages(reader, post):
+        results[name] = {
+            client_name: measure(client, url, requests, cold=cold)
+            for client_name, client in clients.items()
+            if client_name == 'reader' or not login_required
+        }
+    return results
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """Временная тестовая база, которая удаляется после замеров.
+
+    Как и при запуске тестов, DEBUG выключается: иначе в замеры попадут
+    debug toolbar и сохранение текстов SQL-запросов.
+    """
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    try:
+        cache.clear()
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def feed_queries(reader, post):
+    """Запросы лент в том виде, в каком их выполняют представления."""
+    return {
+        'group_posts': Post.objects.filter(group_id=post.group_id)
+        .select_related('author')[:SHOW_POSTS_COUNT],
+        'profile': Post.objects.filter(author_id=post.author_id)
+        .select_related('group')[:SHOW_POSTS_COUNT],
+        'latest_in_group': Post.objects.filter(group_id=post.group_id)
+        .order_by('-pub_date').values_list('pub_date', flat=True)[:1],
+        'comments': post.comments.select_related('author')
+        .order_by('-created', '-pk')[:settings.POSTS_COMMENTS_PER_PAGE],
+        'following': Follow.objects.filter(
+            user=reader, author_id=post.author_id
+        ).values_list('pk', flat=True)[:1],
+    }
+
+
+def time_query(queryset, repeat):
+    """Медиана времени выполнения запроса в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - started)
+    return _milliseconds(statistics.median(timings))
+
+
+def explain_queries(queries, repeat):
+    return {
+        name: {
+            'plan': queryset.explain(),
+            'median_ms': time_query(queryset, repeat),
+        }
+        for name, queryset in queries.items()
+    }
+
+
+@contextmanager
+def without_indexes(models):
+    """Временно удаляет индексы из Meta.indexes моделей."""
+    editor = connection.schema_editor()
+    indexes = [
+        (model, index) for model in models for index in model._meta.indexes
+    ]
+    for model, index in indexes:
+        editor.execute(index.remove_sql(model, editor))
+    try:
+        yield
+    finally:
+        for model, index in indexes:
+            editor.execute(index.create_sql(model, editor))
+
+
+def compare_indexes(repeat=50, **sizes):
+    """Наполняет базу и замеряет запросы лент без индексов и с ними.
+
+    Возвращает словарь {запрос: {'without': ..., 'with': ...}} с планом
+    запроса и медианой времени.
+    """
+    reader, post = seed_posts(**sizes)
+    queries = feed_queries(reader, post)
+    with without_indexes(INDEXED_MODELS):
+        without = explain_queries(queries, repeat)
+    indexed = explain_queries(queries, repeat)
+    return {
+        name: {'without': without[name], 'with': indexed[name]}
+        for name in queries
+    }
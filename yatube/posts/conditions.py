@@ -0,0 +1,68 @@
+"""Дешёвые проверки свежести страниц для условных GET-запросов.
+
+Каждая функция принимает аргументы представления и возвращает дату
+последнего изменения (самый новый пост или комментарий) и имена версий
+из posts.versions, которые меняются при правке уже опубликованных
+данных. В Last-Modified попадает и время смены этих версий, поэтому
+правка и удаление тоже сдвигают дату. Если объекта нет, возвращается
+None.
+"""
+from collections import namedtuple
+
+from . import versions
+from .models import Comment, Group, Post, User
+
+Freshness = namedtuple('Freshness', ('last_modified', 'versions'))
+
+
+def _latest_pub_date(posts):
+    return posts.order_by('-pub_date').values_list(
+        'pub_date', flat=True
+    ).first()
+
+
+def index(request):
+    return Freshness(
+        _latest_pub_date(Post.objects.all()),
+        (versions.INDEX,),
+    )
+
+
+def group(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return Freshness(
+        _latest_pub_date(Post.objects.filter(group_id=group_id)),
+        (versions.group_feed(group_id),),
+    )
+
+
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return Freshness(
+        _latest_pub_date(Post.objects.filter(author_id=author_id)),
+        versions.author_page(author_id),
+    )
+
+
+def post(request, post_id):
+    found = Post.objects.filter(pk=post_id).values_list(
+        'pub_date', 'author_id', 'group_id'
+    ).first()
+    if found is None:
+        return None
+    pub_date, author_id, group_id = found
+    last_comment = Comment.objects.filter(post_id=post_id).order_by(
+        '-created'
+    ).values_list('created', flat=True).first()
+    names = [versions.post_page(post_id), versions.author_feed(author_id)]
+    if group_id is not None:
+        names.append(versions.group_feed(group_id))
+    return Freshness(max(filter(None, (pub_date, last_comment))), names)
@@ -0,0 +1,129 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+ALL_POSTS_COUNT_KEY = 'posts:count:all'
+FOLLOW_POSTS_COUNT_KEY = 'posts:count:follow:{user_id}:{version}'
+
+
+def cached_count(queryset, key=ALL_POSTS_COUNT_KEY):
+    """Отложенный подсчёт постов ленты с хранением результата в кеше.
+
+    Возвращает функцию, чтобы COUNT(*) выполнялся только тогда, когда
+    пагинатору действительно понадобится число записей.
+    """
+    def count():
+        value = cache.get(key)
+        if value is None:
+            value = queryset.count()
+            cache.set(key, value, settings.POSTS_COUNT_CACHE_TIMEOUT)
+        return value
+    return count
+
+
+def invalidate_posts_count():
+    cache.delete(ALL_POSTS_COUNT_KEY)
+
+
+def _increment(field, delta):
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=_increment('posts_count', delta)
+        )
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_increment('comments_count', delta)
+    )
+
+
+def bump_stats(user_id, **deltas):
+    """Изменяет счётчики автора на заданные величины через F().
+
+    Если строки статистики ещё нет, при увеличении она создаётся с
+    пересчитанными значениями. При уменьшении строку не создаём: так
+    бывает при каскадном удалении самого пользователя.
+    """
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{
+            field: _increment(field, delta)
+            for field, delta in deltas.items()
+        }
+    )
+    if not updated and min(deltas.values()) > 0:
+        recount_stats(User.objects.filter(pk=user_id))
+
+
+def get_stats(user):
+    """Статистика пользователя; отсутствующая строка создаётся пересчётом.
+
+    Строки может не быть у пользователей, созданных без сигнала
+    post_save: через loaddata или bulk_create.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        recount_stats(User.objects.filter(pk=user.pk))
+        user.stats = AuthorStats.objects.get(user=user)
+        return user.stats
+
+
+def _count_subquery(queryset, field, outer='pk'):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_stats(users=None):
+    users = User.objects.all() if users is None else users
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(user_id=user_id)
+            for user_id in users.filter(stats__isnull=True)
+            .values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    return AuthorStats.objects.filter(user__in=users).update(
+        posts_count=_count_subquery(
+            Post.objects.all(), 'author', 'user_id'
+        ),
+        followers_count=_count_subquery(
+            Follow.objects.all(), 'author', 'user_id'
+        ),
+        following_count=_count_subquery(
+            Follow.objects.all(), 'user', 'user_id'
+        ),
+    )
+
+
+def recount_counters():
+    """Пересчитывает все денормализованные счётчики по данным в базе."""
+    invalidate_posts_count()
+    return {
+        'groups': Group.objects.update(
+            posts_count=_count_subquery(Post.objects.all(), 'group'),
+        ),
+        'posts': Post.objects.update(
+            comments_count=_count_subquery(Comment.objects.all(), 'post'),
+        ),
+        'authors': recount_stats(),
+    }
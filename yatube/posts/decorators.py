@@ -0,0 +1,139 @@
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from . import versions
+
+ANONYMOUS_PAGE_KEY = 'posts:page:{etag}'
+# Параметры запроса, от которых зависит страница. Остальные (utm-метки и
+# т. п.) в ETag не входят и не плодят копии страницы в кеше.
+PAGE_PARAMS = ('page', 'cursor')
+
+
+def _page_url(request):
+    params = QueryDict(mutable=True)
+    for name in PAGE_PARAMS:
+        value = request.GET.get(name)
+        if value is not None:
+            params[name] = value
+    return f'{request.path}?{params.urlencode()}'
+
+
+def _last_modified(freshness, page_versions):
+    """Самое позднее из дат данных и времени смены версий страницы."""
+    dates = [versions.changed_at(version) for version in page_versions]
+    if freshness.last_modified is not None:
+        dates.append(timegm(freshness.last_modified.utctimetuple()))
+    dates = [date for date in dates if date is not None]
+    return int(max(dates)) if dates else None
+
+
+def _freshness_headers(request, freshness):
+    page_versions = versions.get_versions(*freshness.versions)
+    last_modified = _last_modified(freshness, page_versions)
+    digest = hashlib.md5(_page_url(request).encode())
+    # По AJAX-запросу представление может отдать фрагмент вместо страницы.
+    digest.update(str(request.is_ajax()).encode())
+    digest.update(str(last_modified).encode())
+    for version in page_versions:
+        digest.update(version.encode())
+    if request.user.is_authenticated:
+        # Страница зависит от пользователя и CSRF-токена в формах.
+        digest.update(str(request.user.pk).encode())
+        digest.update(request.user.get_username().encode())
+        digest.update(
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, '').encode()
+        )
+    return quote_etag(digest.hexdigest()), last_modified
+
+
+def _set_freshness_headers(request, response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Cookie', 'X-Requested-With'))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, max_age=0)
+    else:
+        patch_cache_control(response, public=True, max_age=0)
+    return response
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def _freshness_page(freshness_func, for_users):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            authenticated = request.user.is_authenticated
+            if (
+                request.method not in ('GET', 'HEAD')
+                or authenticated and not for_users
+            ):
+                return view(request, *args, **kwargs)
+            freshness = freshness_func(request, *args, **kwargs)
+            if freshness is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = _freshness_headers(request, freshness)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                return _set_freshness_headers(
+                    request, response, etag, last_modified
+                )
+            if authenticated:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                return _set_freshness_headers(
+                    request, response, etag, last_modified
+                )
+            key = ANONYMOUS_PAGE_KEY.format(etag=etag.strip('"'))
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if _cacheable(request, response):
+                    cache.set(
+                        key, response, settings.POSTS_ANONYMOUS_CACHE_TIMEOUT
+                    )
+            return _set_freshness_headers(
+                request, response, etag, last_modified
+            )
+        return wrapper
+    return decorator
+
+
+def cache_anonymous_page(freshness_func):
+    """Кеширует страницу целиком для неавторизованных пользователей.
+
+    freshness_func получает аргументы представления и возвращает
+    conditions.Freshness. Из неё собирается ETag, который служит и
+    ключом кеша, поэтому после нового поста или изменения версии старая
+    копия страницы просто перестаёт использоваться. Клиентам с
+    совпадающим If-None-Match/If-Modified-Since отвечаем 304.
+    """
+    return _freshness_page(freshness_func, for_users=False)
+
+
+def conditional_page(freshness_func):
+    """То же, что cache_anonymous_page, но 304 получают и авторизованные.
+
+    Для авторизованных пользователей страница не кешируется на сервере:
+    в ETag добавляются пользователь и CSRF-cookie, и при совпадении
+    представление не вызывается вовсе.
+    """
+    return _freshness_page(freshness_func, for_users=True)
@@ -0,0 +1,79 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails, variants
+from posts.models import Post
+
+CHUNK_SIZE = 100
+
+
+def _build(image_name, overwrite=False):
+    storage = Post._meta.get_field('image').storage
+    try:
+        return variants.build(image_name, storage, overwrite), None
+    except Exception as error:
+        return None, f'{type(error).__name__}: {error}'
+
+
+def _chunks(posts):
+    """Посты порциями по CHUNK_SIZE по возрастанию pk."""
+    last_pk = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last_pk)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит адаптивные варианты картинок уже опубликованных постов '
+        'в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='число потоков, по умолчанию по числу ядер',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='перестроить варианты и у постов, где они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only(
+            'pk', 'image', 'author_id', 'group_id'
+        ).order_by('pk')
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        build = partial(_build, overwrite=options['all'])
+        built = failed = 0
+        # Pillow отпускает GIL при пережатии, поэтому хватает потоков:
+        # они работают только с хранилищем, а база остаётся в основном
+        # потоке.
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for chunk in _chunks(posts):
+                results = executor.map(
+                    build, [post.image.name for post in chunk]
+                )
+                for post, (srcsets, error) in zip(chunk, results):
+                    if error:
+                        failed += 1
+                        self.stderr.write(f'Пост {post.pk}: {error}')
+                        continue
+                    if thumbnails.save_images(
+                        post, image_variants=json.dumps(srcsets)
+                    ):
+                        built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Варианты построены: {built}, ошибок: {failed}'
+        ))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы и время запросов лент без составных индексов и '
+        'с ними на сгенерированных данных во временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--authors', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=100)
+        parser.add_argument('--followers', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help='файл, куда сохранить результаты в JSON',
+        )
+
+    def handle(self, *args, **options):
+        sizes = {
+            name: options[name]
+            for name in (
+                'authors', 'groups', 'posts', 'comments', 'follows',
+                'followers',
+            )
+        }
+        with benchmarks.isolated_database(options['verbosity'] - 1):
+            vendor = connection.vendor
+            results = benchmarks.compare_indexes(
+                repeat=options['repeat'], **sizes
+            )
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{name}: {result["without"]["median_ms"]} ms -> '
+                f'{result["with"]["median_ms"]} ms'
+            ))
+            for variant in ('without', 'with'):
+                self.stdout.write(f'  {variant}:')
+                for line in result[variant]['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+        if options['output']:
+            report = {'database': vendor, 'sizes': sizes, 'results': results}
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
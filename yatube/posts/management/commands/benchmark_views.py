@@ -0,0 +1,81 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и время рендеринга страниц '
+        'posts на сгенерированных данных во временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=200)
+        parser.add_argument('--follows', type=int, default=30)
+        parser.add_argument('--followers', type=int, default=0)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='очищать кеш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--label',
+            default='',
+            help='метка прогона, например хеш коммита',
+        )
+        parser.add_argument(
+            '--output',
+            help='файл, куда сохранить результаты в JSON',
+        )
+
+    def handle(self, *args, **options):
+        sizes = {
+            name: options[name]
+            for name in (
+                'authors', 'groups', 'posts', 'comments', 'follows',
+                'followers',
+            )
+        }
+        with benchmarks.isolated_database(options['verbosity'] - 1):
+            vendor = connection.vendor
+            results = benchmarks.run(
+                requests=options['requests'], cold=options['cold'], **sizes
+            )
+        report = {
+            'label': options['label'],
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': vendor,
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'sizes': sizes,
+            'results': results,
+        }
+        for page, clients in results.items():
+            for client, summary in clients.items():
+                latency = summary['latency_ms']
+                self.stdout.write(
+                    f'{page:<13} {client:<7} '
+                    f'{summary["rps"]:>8} rps  '
+                    f'p50 {latency["p50"]:>8} ms  '
+                    f'p99 {latency["p99"]:>8} ms  '
+                    f'queries {summary["queries"]["max"]:>3}  '
+                    f'render {summary["render_ms"]["p50"]:>8} ms'
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='база, в которой пересобрать индекс',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if search.get_index(connection) is None:
+            self.stdout.write(self.style.WARNING(
+                f'Для {connection.vendor} индекса нет, поиск идёт через LIKE'
+            ))
+            return
+        total = search.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано документов: {total}'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids',
+            nargs='*',
+            type=int,
+            help='id пользователей, чьи ленты нужно пересобрать',
+        )
+
+    def handle(self, *args, **options):
+        if not timeline.is_enabled():
+            raise CommandError('POSTS_TIMELINE_ENABLED выключен')
+        timeline.rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны'))
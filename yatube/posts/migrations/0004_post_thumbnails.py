@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_timeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, default='', editable=False, help_text='URL готовых миниатюр картинки в формате JSON', verbose_name='Миниатюры'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 2.2.16 on 2026-10-17 02:17
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def count_subquery(model, field, outer='pk'):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """Оставляет самую раннюю подписку из каждой группы дублей.
+
+    Строки просматриваются диапазонами первичного ключа по BATCH_SIZE,
+    поиск более ранней копии идёт по индексу (user, author). Счётчики
+    подписок затронутых пользователей пересчитываются заново.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    db = schema_editor.connection.alias
+    follows = Follow.objects.using(db).order_by()
+    last_pk = follows.aggregate(last=Max('pk'))['last'] or 0
+    earlier = follows.filter(
+        user_id=OuterRef('user_id'),
+        author_id=OuterRef('author_id'),
+        pk__lt=OuterRef('pk'),
+    )
+    user_ids = set()
+    for start in range(0, last_pk + 1, BATCH_SIZE):
+        duplicates = follows.filter(
+            pk__gte=start, pk__lt=start + BATCH_SIZE
+        ).annotate(duplicate=Exists(earlier)).filter(duplicate=True)
+        for user_id, author_id in duplicates.values_list(
+            'user_id', 'author_id'
+        ):
+            user_ids.update((user_id, author_id))
+        Follow.objects.using(db).filter(
+            pk__in=duplicates.values('pk')
+        ).delete()
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE // 10):
+        AuthorStats.objects.using(db).filter(
+            user_id__in=user_ids[start:start + BATCH_SIZE // 10]
+        ).update(
+            followers_count=count_subquery(Follow, 'author', 'user_id'),
+            following_count=count_subquery(Follow, 'user', 'user_id'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='follow_user_author_idx',
+        ),
+    ]
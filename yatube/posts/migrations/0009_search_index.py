@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.db import migrations
+
+# Схема индекса на момент миграции. posts.search может меняться дальше,
+# поэтому миграция не импортирует его.
+TABLE = 'posts_search_index'
+BATCH_SIZE = 1000
+
+SQLITE_CREATE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    'text, kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, '
+    "tokenize = 'unicode61 remove_diacritics 2')",
+)
+SQLITE_INSERT = (
+    f'INSERT INTO {TABLE} (rowid, text, kind, object_id, post_id) '
+    'VALUES (%s, %s, %s, %s, %s)'
+)
+
+POSTGRES_CREATE = (
+    f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+    'kind varchar(16) NOT NULL, object_id bigint NOT NULL, '
+    'post_id bigint NOT NULL, document tsvector NOT NULL, '
+    'PRIMARY KEY (kind, object_id))',
+    f'CREATE INDEX IF NOT EXISTS {TABLE}_document '
+    f'ON {TABLE} USING GIN (document)',
+    f'CREATE INDEX IF NOT EXISTS {TABLE}_post ON {TABLE} (post_id)',
+)
+POSTGRES_INSERT = (
+    f'INSERT INTO {TABLE} (kind, object_id, post_id, document) '
+    'VALUES (%s, %s, %s, to_tsvector(%s::regconfig, %s))'
+)
+
+
+def normalize(text):
+    return text.lower().replace('ё', 'е')
+
+
+def sqlite_row(kind, object_id, post_id, text):
+    rowid = object_id * 2 + ('post', 'comment').index(kind)
+    return rowid, normalize(text), kind, object_id, post_id
+
+
+def postgres_row(kind, object_id, post_id, text):
+    return (
+        kind, object_id, post_id, settings.POSTS_SEARCH_CONFIG,
+        normalize(text),
+    )
+
+
+BACKENDS = {
+    'sqlite': (SQLITE_CREATE, SQLITE_INSERT, sqlite_row),
+    'postgresql': (POSTGRES_CREATE, POSTGRES_INSERT, postgres_row),
+}
+
+
+def documents(apps):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    for pk, text in posts.iterator(chunk_size=BATCH_SIZE):
+        yield 'post', pk, pk, text
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'text'
+    )
+    for pk, post_id, text in comments.iterator(chunk_size=BATCH_SIZE):
+        yield 'comment', pk, post_id, text
+
+
+def create_search_index(apps, schema_editor):
+    """Создаёт полнотекстовый индекс и заполняет его текущими данными."""
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    statements, insert, make_row = backend
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+        batch = []
+        for document in documents(apps):
+            batch.append(make_row(*document))
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(insert, batch)
+                batch = []
+        cursor.executemany(insert, batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in BACKENDS:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_unique_follow'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
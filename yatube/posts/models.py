@@ -1,11 +1,38 @@
+import json
+
 from core.models import CreatedModel
+from core.storage import ContentHashStorage
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
 
-class Group(models.Model):
+class CountersMixin:
+    """Не перезаписывает счётчики при сохранении загруженного объекта.
+
+    Счётчики меняются только через F() в сигналах, поэтому значения в
+    памяти могут устареть и не должны попадать в UPDATE.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CountersMixin, models.Model):
     title = models.CharField(
         'Заголовок',
         max_length=200,
@@ -15,6 +42,13 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField('Описание')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'Группа постов'
@@ -24,7 +58,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(CountersMixin, models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -52,17 +86,59 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentHashStorage(),
+        blank=True,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    thumbnails = models.TextField(
+        'Миниатюры',
+        blank=True,
+        default='',
+        editable=False,
+        help_text='URL готовых миниатюр картинки в формате JSON',
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
         blank=True,
+        default='',
+        editable=False,
+        help_text='srcset вариантов картинки по форматам в формате JSON',
     )
 
+    counter_fields = ('comments_count',)
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text
 
+    @cached_property
+    def thumbnail_urls(self):
+        """Словарь {размер из POSTS_THUMBNAIL_SIZES: URL миниатюры}."""
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
+    @cached_property
+    def image_srcsets(self):
+        """Словарь {формат: srcset} адаптивных вариантов картинки."""
+        return json.loads(self.image_variants) if self.image_variants else {}
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -87,11 +163,74 @@ class Comment(CreatedModel):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.text
 
 
+class FollowQuerySet(models.QuerySet):
+    """Подписка и отписка одним запросом без предварительного SELECT.
+
+    Сигналы post_save и post_delete отправляются вручную и только если
+    строка действительно вставлена или удалена, поэтому счётчики, лента
+    подписок и версии кеша меняются ровно один раз даже при
+    одновременных запросах.
+    """
+
+    def _insert_ignore_sql(self, connection):
+        ops = connection.ops
+        meta = self.model._meta
+        columns = ', '.join(
+            ops.quote_name(meta.get_field(name).column)
+            for name in ('user', 'author')
+        )
+        return (
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(meta.db_table)} ({columns}) VALUES (%s, %s) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+        )
+
+    def follow(self, user, author):
+        """Подписывает user на author; True, если подписки не было."""
+        self._for_write = True
+        connection = connections[self.db]
+        follow = self.model(user=user, author=author)
+        with transaction.atomic(using=self.db, savepoint=False):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    self._insert_ignore_sql(connection),
+                    (follow.user_id, follow.author_id),
+                )
+                created = cursor.rowcount == 1
+            if created:
+                post_save.send(
+                    sender=self.model, instance=follow, created=True,
+                    update_fields=None, raw=False, using=self.db,
+                )
+        return created
+
+    def unfollow(self, user, author):
+        """Отписывает user от author; True, если подписка была."""
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            deleted = self.filter(user=user, author=author)._raw_delete(
+                self.db
+            )
+            if deleted:
+                post_delete.send(
+                    sender=self.model,
+                    instance=self.model(user=user, author=author),
+                    using=self.db,
+                )
+        return bool(deleted)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -106,10 +245,79 @@ class Follow(models.Model):
         verbose_name='Автор поста'
     )
 
+    objects = FollowQuerySet.as_manager()
+
     class Meta:
         ordering = ('-author',)
         verbose_name = 'Лента автора'
         verbose_name_plural = 'Лента авторов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        )
 
     def __str__(self) -> str:
         return f'{self.user} подписался на {self.author}'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self) -> str:
+        return f'Статистика {self.user}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date'),
+                name='timeline_user_pub_date_idx',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.post_id} в ленте {self.user_id}'
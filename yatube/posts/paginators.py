@@ -0,0 +1,192 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class FeedPaginator(Paginator):
+    """Paginator, которому можно передать заранее известное число записей.
+
+    count принимает число или функцию без аргументов: так ленты берут
+    количество постов из кеша, а не выполняют SELECT COUNT(*) на каждый
+    запрос.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return super().count
+        if callable(self._count):
+            return self._count()
+        return self._count
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page, который нужен
+    шаблонам, но вместо номеров страниц отдаёт непрозрачные курсоры.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, cursor='',
+                 has_next=False, has_previous=False):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage {self.number or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу сортировки без COUNT(*) и OFFSET.
+
+    Курсор хранит значения полей сортировки крайнего объекта страницы,
+    поэтому каждая страница выбирается одним запросом с LIMIT вне
+    зависимости от её "глубины". Последнее поле сортировки должно быть
+    уникальным (обычно pk), иначе записи с одинаковым ключом потеряются.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-pk')):
+        self.object_list = object_list.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in ordering)
+        opts = object_list.model._meta
+        self._model_fields = tuple(
+            opts.pk if name == 'pk' else opts.get_field(name)
+            for name in self.fields
+        )
+
+    @property
+    def count(self):
+        return self.object_list.count()
+
+    def encode_cursor(self, direction, obj):
+        values = [
+            field.value_to_string(obj) for field in self._model_fields
+        ]
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(values) != len(self._model_fields):
+                raise ValueError(values)
+            values = [
+                field.to_python(value)
+                for field, value in zip(self._model_fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError,
+                binascii.Error) as error:
+            raise InvalidCursor(cursor) from error
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _keyset_filter(self, values, forward):
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            descending = self.ordering[index].startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_name, prev_value in zip(self.fields, values[:index]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None):
+        limit = self.per_page + 1
+        if not cursor:
+            items = list(self.object_list[:limit])
+            return CursorPage(
+                items[:self.per_page], self,
+                has_next=len(items) > self.per_page,
+            )
+        direction, values = self.decode_cursor(cursor)
+        if direction == NEXT:
+            items = list(
+                self.object_list.filter(
+                    self._keyset_filter(values, forward=True)
+                )[:limit]
+            )
+            return CursorPage(
+                items[:self.per_page], self, cursor,
+                has_next=len(items) > self.per_page,
+                has_previous=True,
+            )
+        reverse = tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        )
+        items = list(
+            self.object_list.filter(
+                self._keyset_filter(values, forward=False)
+            ).order_by(*reverse)[:limit]
+        )
+        has_previous = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        return CursorPage(
+            items, self, cursor,
+            has_next=True,
+            has_previous=has_previous,
+        )
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
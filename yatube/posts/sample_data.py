@@ -0,0 +1,52 @@
+"""Генерация тестовых данных для тестов и замеров производительности."""
+from faker import Faker
+from mixer.backend.django import mixer
+
+from .models import Comment, Follow, Group, Post, User
+
+fake = Faker('ru_RU')
+
+
+def seed_posts(authors=20, groups=3, posts=300, comments=200, follows=15,
+               followers=0):
+    """Наполняет базу реалистичным объёмом данных через mixer и Faker.
+
+    Возвращает читателя, подписанного на follows авторов, и пост, к
+    которому оставлены все комментарии. Ещё followers пользователей
+    подписываются на первого автора, чтобы у него была большая аудитория.
+    """
+    fake.seed_instance(0)
+    users = mixer.cycle(authors).blend(
+        User, username=(fake.unique.user_name() for _ in range(authors))
+    )
+    mixer.cycle(groups).blend(
+        Group,
+        title=(fake.unique.word() for _ in range(groups)),
+        slug=(f'group-{number}' for number in range(groups)),
+    )
+    mixer.cycle(posts).blend(
+        Post,
+        text=(fake.paragraph() for _ in range(posts)),
+        author=mixer.SELECT,
+        group=mixer.SELECT,
+        image='',
+    )
+    post = Post.objects.latest('pub_date', 'pk')
+    mixer.cycle(comments).blend(
+        Comment,
+        post=post,
+        author=mixer.SELECT(pk__in=[user.pk for user in users]),
+        text=(fake.sentence() for _ in range(comments)),
+    )
+    reader = mixer.blend(User, username='reader')
+    follows = min(follows, authors)
+    mixer.cycle(follows).blend(
+        Follow, user=reader, author=(user for user in users[:follows])
+    )
+    fans = mixer.cycle(followers).blend(
+        User, username=(f'fan-{number}' for number in range(followers))
+    )
+    mixer.cycle(followers).blend(
+        Follow, user=(fan for fan in fans), author=users[0]
+    )
+    return reader, post
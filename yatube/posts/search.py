@@ -0,0 +1,310 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Тексты постов и комментариев хранятся в обратном индексе
+posts_search_index: в SQLite это виртуальная таблица FTS5, в PostgreSQL —
+таблица с колонкой tsvector и GIN-индексом. Индекс обновляется
+сигналами при сохранении и удалении, а rebuild() строит его заново
+(команда rebuild_search_index). На других базах поиск работает через
+LIKE без индекса.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+
+TABLE = 'posts_search_index'
+POST = 'post'
+COMMENT = 'comment'
+KINDS = (POST, COMMENT)
+TERM = re.compile(r'[^\W_]+')
+MAX_TERMS = 10
+BATCH_SIZE = 1000
+
+
+def normalize(text):
+    return text.lower().replace('ё', 'е')
+
+
+def terms(query):
+    """Слова запроса без операторов и знаков препинания."""
+    return TERM.findall(normalize(query))[:MAX_TERMS]
+
+
+class SqliteIndex:
+    """FTS5 с ранжированием bm25; rowid кодирует тип и id объекта."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+            'text, kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def _rowid(self, kind, object_id):
+        return object_id * len(KINDS) + KINDS.index(kind)
+
+    def update(self, cursor, rows):
+        rows = list(rows)
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [(self._rowid(kind, object_id),) for kind, object_id, *_ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, text, kind, object_id, post_id) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            [
+                (self._rowid(kind, object_id), normalize(text), kind,
+                 object_id, post_id)
+                for kind, object_id, post_id, text in rows
+            ],
+        )
+
+    def delete(self, cursor, kind, object_id):
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [self._rowid(kind, object_id)],
+        )
+
+    def _match(self, words, kind):
+        sql = f'FROM {TABLE} WHERE {TABLE} MATCH %s'
+        params = [' '.join(f'"{word}"*' for word in words)]
+        if kind:
+            sql += ' AND kind = %s'
+            params.append(kind)
+        return sql, params
+
+    def count(self, cursor, words, kind=None):
+        column = 'object_id' if kind else 'post_id'
+        sql, params = self._match(words, kind)
+        cursor.execute(f'SELECT COUNT(DISTINCT {column}) {sql}', params)
+        return cursor.fetchone()[0]
+
+    def ids_sql(self, words, kind):
+        sql, params = self._match(words, kind)
+        return f'SELECT object_id {sql}', params
+
+    def search(self, cursor, words, kind=None, limit=None, offset=0):
+        column = 'object_id' if kind else 'post_id'
+        sql, params = self._match(words, kind)
+        cursor.execute(
+            f'SELECT found_id FROM (SELECT {column} AS found_id, rank {sql}) '
+            'GROUP BY found_id ORDER BY MIN(rank), found_id DESC '
+            'LIMIT %s OFFSET %s',
+            params + [-1 if limit is None else limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresIndex:
+    """tsvector с GIN-индексом и ранжированием ts_rank."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            'kind varchar(16) NOT NULL, object_id bigint NOT NULL, '
+            'post_id bigint NOT NULL, document tsvector NOT NULL, '
+            'PRIMARY KEY (kind, object_id))'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_document '
+            f'ON {TABLE} USING GIN (document)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_post ON {TABLE} (post_id)'
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+    def update(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (kind, object_id, post_id, document) '
+            'VALUES (%s, %s, %s, to_tsvector(%s::regconfig, %s)) '
+            'ON CONFLICT (kind, object_id) DO UPDATE '
+            'SET post_id = EXCLUDED.post_id, document = EXCLUDED.document',
+            [
+                (kind, object_id, post_id, settings.POSTS_SEARCH_CONFIG,
+                 normalize(text))
+                for kind, object_id, post_id, text in rows
+            ],
+        )
+
+    def delete(self, cursor, kind, object_id):
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s',
+            [kind, object_id],
+        )
+
+    def _match(self, words, kind):
+        sql = (
+            f'FROM {TABLE}, to_tsquery(%s::regconfig, %s) AS query '
+            'WHERE document @@ query'
+        )
+        params = [
+            settings.POSTS_SEARCH_CONFIG,
+            ' & '.join(f'{word}:*' for word in words),
+        ]
+        if kind:
+            sql += ' AND kind = %s'
+            params.append(kind)
+        return sql, params
+
+    def count(self, cursor, words, kind=None):
+        column = 'object_id' if kind else 'post_id'
+        sql, params = self._match(words, kind)
+        cursor.execute(f'SELECT COUNT(DISTINCT {column}) {sql}', params)
+        return cursor.fetchone()[0]
+
+    def ids_sql(self, words, kind):
+        sql, params = self._match(words, kind)
+        return f'SELECT object_id {sql}', params
+
+    def search(self, cursor, words, kind=None, limit=None, offset=0):
+        column = 'object_id' if kind else 'post_id'
+        sql, params = self._match(words, kind)
+        cursor.execute(
+            f'SELECT {column} {sql} GROUP BY {column} '
+            f'ORDER BY MAX(ts_rank(document, query)) DESC, {column} DESC '
+            'LIMIT %s OFFSET %s',
+            params + [limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SqliteIndex,
+    'postgresql': PostgresIndex,
+}
+
+
+def get_index(connection):
+    backend = BACKENDS.get(connection.vendor)
+    return backend() if backend else None
+
+
+def _write_connection():
+    return connections[router.db_for_write(Post)]
+
+
+def index_post(post):
+    connection = _write_connection()
+    index = get_index(connection)
+    if index is not None:
+        with connection.cursor() as cursor:
+            index.update(cursor, [(POST, post.pk, post.pk, post.text)])
+
+
+def index_comment(comment):
+    connection = _write_connection()
+    index = get_index(connection)
+    if index is not None:
+        with connection.cursor() as cursor:
+            index.update(
+                cursor,
+                [(COMMENT, comment.pk, comment.post_id, comment.text)],
+            )
+
+
+def remove(kind, object_id):
+    connection = _write_connection()
+    index = get_index(connection)
+    if index is not None:
+        with connection.cursor() as cursor:
+            index.delete(cursor, kind, object_id)
+
+
+def _documents():
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    for pk, text in posts.iterator(chunk_size=BATCH_SIZE):
+        yield POST, pk, pk, text
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'text'
+    )
+    for pk, post_id, text in comments.iterator(chunk_size=BATCH_SIZE):
+        yield COMMENT, pk, post_id, text
+
+
+def rebuild(connection):
+    """Создаёт индекс заново по всем постам и комментариям."""
+    index = get_index(connection)
+    if index is None:
+        return 0
+    total = 0
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        index.drop(cursor)
+        index.create(cursor)
+        batch = []
+        for document in _documents():
+            batch.append(document)
+            if len(batch) == BATCH_SIZE:
+                index.update(cursor, batch)
+                total += len(batch)
+                batch = []
+        index.update(cursor, batch)
+        total += len(batch)
+    return total
+
+
+class SearchResults:
+    """Посты по запросу в порядке релевантности для Paginator.
+
+    Пост находится и по своему тексту, и по тексту комментариев к нему.
+    Paginator запрашивает count() и срез текущей страницы, поэтому из
+    индекса читаются только id постов этой страницы.
+    """
+
+    def __init__(self, query):
+        self.words = terms(query)
+        self.connection = connections[router.db_for_read(Post)]
+        self.index = get_index(self.connection)
+
+    def _fallback(self):
+        return Post.objects.filter(
+            pk__in=Comment.objects.filter(
+                text__icontains=' '.join(self.words)
+            ).values('post_id')
+        ) | Post.objects.filter(text__icontains=' '.join(self.words))
+
+    def count(self):
+        if not self.words:
+            return 0
+        if self.index is None:
+            return self._fallback().count()
+        with self.connection.cursor() as cursor:
+            return self.index.count(cursor, self.words)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if not self.words:
+            return []
+        posts = Post.objects.select_related('author', 'group')
+        if self.index is None:
+            return list(posts.filter(pk__in=self._fallback())[key])
+        offset = key.start or 0
+        limit = None if key.stop is None else key.stop - offset
+        with self.connection.cursor() as cursor:
+            ids = self.index.search(
+                cursor, self.words, limit=limit, offset=offset
+            )
+        found = posts.in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+
+def matching_ids(query, kind):
+    """Подзапрос id постов или комментариев для поиска в админке."""
+    words = terms(query)
+    index = get_index(connections[router.db_for_read(Post)])
+    if not words or index is None:
+        return None
+    return RawSQL(*index.ids_sql(words, kind))
@@ -0,0 +1,95 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from . import counters, search, timeline, versions
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+USER_DISPLAY_FIELDS = frozenset(('username', 'first_name', 'last_name'))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    elif update_fields is None or USER_DISPLAY_FIELDS & set(update_fields):
+        versions.bump_author_pages(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        versions.bump_group_pages(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    versions.bump_group_pages(instance.pk)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.invalidate_posts_count()
+        counters.bump_stats(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+        timeline.fan_out_post(instance)
+    elif instance.group_id != instance._initial_group_id:
+        counters.bump_group(instance._initial_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+    versions.bump_post_pages(instance, instance._initial_group_id)
+    instance._initial_group_id = instance.group_id
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.invalidate_posts_count()
+    counters.bump_stats(instance.author_id, posts_count=-1)
+    counters.bump_group(instance._initial_group_id, -1)
+    versions.bump_post_pages(instance, instance._initial_group_id)
+    search.remove(search.POST, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_post(instance.post_id, 1)
+        versions.bump(versions.post_page(instance.post_id))
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    versions.bump(versions.post_page(instance.post_id))
+    search.remove(search.COMMENT, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_stats(instance.author_id, followers_count=1)
+        counters.bump_stats(instance.user_id, following_count=1)
+        timeline.add_author(instance.user_id, instance.author_id)
+        versions.bump_follow_pages(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_stats(instance.author_id, followers_count=-1)
+    counters.bump_stats(instance.user_id, following_count=-1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    versions.bump_follow_pages(instance.user_id, instance.author_id)
@@ -0,0 +1,10 @@
+from django import template
+
+from posts.thumbnails import attach_thumbnails
+
+register = template.Library()
+
+
+@register.filter
+def with_thumbnails(posts):
+    return attach_thumbnails(posts)
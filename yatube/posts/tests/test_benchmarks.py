@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test import TestCase
+
+from .. import benchmarks
+from ..models import Post
+
+
+class BenchmarksTest(TestCase):
+    def test_percentile(self):
+        """Процентиль считается по ближайшему рангу."""
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(benchmarks.percentile(values, 50), 3)
+        self.assertEqual(benchmarks.percentile(values, 99), 5)
+        self.assertEqual(benchmarks.percentile(values, 0), 1)
+        self.assertIsNone(benchmarks.percentile([], 50))
+
+    def test_run_reports_all_pages(self):
+        """Замеры проходят по всем страницам для гостя и читателя."""
+        results = benchmarks.run(
+            requests=2, authors=3, groups=1, posts=5, comments=2, follows=2
+        )
+        self.assertEqual(
+            set(results),
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index'},
+        )
+        self.assertEqual(set(results['follow_index']), {'reader'})
+        summary = results['index']['guest']
+        self.assertEqual(summary['requests'], 2)
+        self.assertGreaterEqual(summary['queries']['max'], 1)
+        self.assertLessEqual(
+            summary['latency_ms']['p50'], summary['latency_ms']['max']
+        )
+
+    def test_compare_indexes(self):
+        """Без составных индексов ленты сортируются, с ними — нет."""
+        results = benchmarks.compare_indexes(
+            repeat=1, authors=3, groups=1, posts=5, comments=2, follows=2
+        )
+        group_posts = results['group_posts']
+        self.assertIn('post_group_pub_date_idx', group_posts['with']['plan'])
+        self.assertNotIn(
+            'post_group_pub_date_idx', group_posts['without']['plan']
+        )
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        self.assertIn('post_group_pub_date_idx', constraints)
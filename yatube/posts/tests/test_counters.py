@@ -0,0 +1,168 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Другая тестовая группа',
+            slug='another-test-slug',
+            description='Другое тестовое описание',
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def refresh(self, *objects):
+        for obj in objects:
+            obj.refresh_from_db()
+
+    def test_stats_created_with_user(self):
+        """У нового пользователя есть строка статистики."""
+        self.assertTrue(AuthorStats.objects.filter(user=self.user).exists())
+
+    def test_missing_stats(self):
+        """Профиль пользователя без строки статистики открывается."""
+        User.objects.bulk_create([User(username='BulkUser')])
+        author = User.objects.get(username='BulkUser')
+        Post.objects.create(text='Тестовый пост', author=author)
+        AuthorStats.objects.filter(user=author).delete()
+        response = self.reader_client.get(
+            reverse('posts:profile', args=(author.username,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Всего постов: 1')
+
+    def test_post_counters(self):
+        """Счётчики постов меняются при создании, переносе и удалении."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        self.refresh(self.group, self.user.stats)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.user.stats.posts_count, 1)
+
+        post.group = self.another_group
+        post.save()
+        self.refresh(self.group, self.another_group)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.another_group.posts_count, 1)
+
+        post.delete()
+        self.refresh(self.another_group, self.user.stats)
+        self.assertEqual(self.another_group.posts_count, 0)
+        self.assertEqual(self.user.stats.posts_count, 0)
+
+    def test_stale_instance_keeps_counters(self):
+        """Сохранение устаревшего объекта не затирает счётчик."""
+        stale_group = Group.objects.get(pk=self.group.pk)
+        Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        stale_group.title = 'Новое название'
+        stale_group.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.title, 'Новое название')
+        self.assertEqual(self.group.posts_count, 1)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев обновляется при комментировании."""
+        post = Post.objects.create(text='Тестовый пост', author=self.user)
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.id}),
+            data={'text': 'Тестовый комментарий'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.get(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Счётчики подписок обновляются при подписке и отписке."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.user})
+        )
+        self.refresh(self.user.stats, self.reader.stats)
+        self.assertEqual(self.user.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': self.user})
+        )
+        self.refresh(self.user.stats, self.reader.stats)
+        self.assertEqual(self.user.stats.followers_count, 0)
+        self.assertEqual(self.reader.stats.following_count, 0)
+
+    def test_repeated_follow_counted_once(self):
+        """Повторная подписка и отписка не меняют счётчики дважды."""
+        url = reverse('posts:profile_follow', kwargs={'username': self.user})
+        self.reader_client.get(url)
+        self.reader_client.get(url)
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader, author=self.user).count(),
+            1,
+        )
+        self.refresh(self.user.stats, self.reader.stats)
+        self.assertEqual(self.user.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertTrue(Follow.objects.unfollow(self.reader, self.user))
+        self.assertFalse(Follow.objects.unfollow(self.reader, self.user))
+        self.refresh(self.user.stats, self.reader.stats)
+        self.assertEqual(self.user.stats.followers_count, 0)
+        self.assertEqual(self.reader.stats.following_count, 0)
+
+    def test_follow_single_statement(self):
+        """Подписка и отписка выполняются без SELECT перед записью."""
+        self.assertTrue(Follow.objects.follow(self.reader, self.user))
+        with CaptureQueriesContext(connection) as captured:
+            self.assertFalse(Follow.objects.follow(self.reader, self.user))
+        self.assertEqual(len(captured), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.user)
+
+    def test_recount_command_repairs_counters(self):
+        """Команда recount_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        Comment.objects.bulk_create(
+            [Comment(post=post, author=self.reader, text=f'Комментарий {i}')
+             for i in range(2)]
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.user)]
+        )
+        Group.objects.update(posts_count=7)
+        AuthorStats.objects.all().delete()
+
+        call_command('recount_counters', stdout=StringIO())
+
+        self.refresh(self.group, post)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 2)
+        stats = AuthorStats.objects.get(user=self.user)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1
+        )
@@ -1,4 +1,7 @@
+import io
+import os
 import shutil
+import struct
 import tempfile
 
 from django.conf import settings
@@ -6,6 +9,7 @@ from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Comment, Group, Post
 
@@ -13,6 +17,8 @@ User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+IMAGE_NAME_PATTERN = r'^posts/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}\.{}$'
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostsFormTest(TestCase):
@@ -87,14 +93,12 @@ class PostsFormTest(TestCase):
             )
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
-        self.assertTrue(
-            Post.objects.filter(
-                author=self.user,
-                text=form_data['text'],
-                group=self.group,
-                image='posts/small.gif'
-            ).exists()
+        post = Post.objects.get(
+            author=self.user,
+            text=form_data['text'],
+            group=self.group,
         )
+        self.assertRegex(post.image.name, IMAGE_NAME_PATTERN.format('gif'))
 
     def test_guest_create_post(self):
         """Запись не создается  неавторизованному пользователю"""
@@ -292,3 +296,169 @@ class CommentFormTest(TestCase):
             follow=True,
         )
         self.assertEqual(Comment.objects.count(), comments_count)
+
+
+def image_upload(name, size, image_format='JPEG', mode='RGB',
+                 **save_options):
+    buffer = io.BytesIO()
+    Image.new(mode, size).save(buffer, image_format, **save_options)
+    return SimpleUploadedFile(
+        name=name,
+        content=buffer.getvalue(),
+        content_type=Image.MIME[image_format],
+    )
+
+
+def mpo_upload(name, size, exif):
+    """JPEG с превью в сегменте MPF, как у фотографий с телефона."""
+    photo, preview = io.BytesIO(), io.BytesIO()
+    Image.new('RGB', size, 'blue').save(photo, 'JPEG', exif=exif)
+    Image.new('RGB', (16, 16), 'red').save(preview, 'JPEG')
+    photo, preview = photo.getvalue(), preview.getvalue()
+    # Заголовок MPF: TIFF-каталог из трёх тегов и две записи о картинках.
+    entries_offset = 8 + 2 + 3 * 12 + 4
+    segment_length = 2 + 4 + entries_offset + 2 * 16
+    photo_size = len(photo) + 2 + segment_length
+    # Смещения отсчитываются от заголовка после SOI, маркера,
+    # длины сегмента и сигнатуры MPF.
+    preview_offset = photo_size - (2 + 2 + 2 + 4)
+    segment = b''.join((
+        b'\xff\xe2',
+        struct.pack('>H', segment_length),
+        b'MPF\x00II*\x00',
+        struct.pack('<IH', 8, 3),
+        struct.pack('<HHI4s', 0xB000, 7, 4, b'0100'),
+        struct.pack('<HHII', 0xB001, 4, 1, 2),
+        struct.pack('<HHII', 0xB002, 7, 32, entries_offset),
+        struct.pack('<I', 0),
+        struct.pack('<IIIHH', 0x20030000, photo_size, 0, 0, 0),
+        struct.pack('<IIIHH', 0x00010001, len(preview), preview_offset,
+                    0, 0),
+    ))
+    return SimpleUploadedFile(
+        name=name,
+        content=photo[:2] + segment + photo[2:] + preview,
+        content_type='image/jpeg',
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_IMAGE_MAX_DIMENSIONS=(200, 200)
+)
+class PostImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': image},
+        )
+
+    def test_image_downsized_without_metadata(self):
+        """Картинка уменьшается и сохраняется без EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Камера'
+        self.create_post(
+            image_upload('photo.jpeg', (800, 400), exif=exif.tobytes())
+        )
+        post = Post.objects.get()
+        self.assertRegex(post.image.name, IMAGE_NAME_PATTERN.format('jpeg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (200, 100))
+            self.assertEqual(image.format, 'JPEG')
+            self.assertNotIn('exif', image.info)
+
+    def test_color_profile_kept(self):
+        """Цветовой профиль сохраняется в пересжатой картинке."""
+        # Кодировщик встраивает профиль как есть, не разбирая его.
+        profile = b'test icc profile' * 16
+        self.create_post(
+            image_upload('photo.jpg', (800, 400), icc_profile=profile)
+        )
+        with Image.open(Post.objects.get().image.path) as image:
+            self.assertEqual(image.info.get('icc_profile'), profile)
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки разных постов хранятся одним файлом."""
+        for _ in range(2):
+            self.create_post(image_upload('photo.jpg', (20, 20)))
+        first, second = Post.objects.all()
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_unknown_format_converted_to_png(self):
+        """Картинки в редких форматах пересохраняются в PNG."""
+        self.create_post(image_upload('picture.bmp', (20, 20), 'BMP'))
+        post = Post.objects.get()
+        self.assertRegex(post.image.name, IMAGE_NAME_PATTERN.format('png'))
+
+    def test_mpo_photo_converted_to_jpeg(self):
+        """Фото с превью MPF обрабатывается как обычный JPEG."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Камера'
+        upload = mpo_upload('photo.jpg', (800, 400), exif.tobytes())
+        with Image.open(upload) as image:
+            self.assertEqual(image.format, 'MPO')
+            self.assertTrue(image.is_animated)
+        self.create_post(upload)
+        post = Post.objects.get()
+        self.assertRegex(post.image.name, IMAGE_NAME_PATTERN.format('jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (200, 100))
+            self.assertNotIn('exif', image.info)
+            self.assertNotIn('mp', image.info)
+
+    def test_unsupported_png_modes_converted(self):
+        """Картинки в режимах, которых нет в PNG, переводятся в RGB и L."""
+        for mode, expected_mode in (('CMYK', 'RGB'), ('F', 'L')):
+            with self.subTest(mode=mode):
+                response = self.create_post(
+                    image_upload('scan.tiff', (20, 20), 'TIFF', mode)
+                )
+                self.assertEqual(response.status_code, 302)
+                post = Post.objects.latest('pk')
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.format, 'PNG')
+                    self.assertEqual(image.mode, expected_mode)
+
+    def test_animation_kept(self):
+        """Анимированный GIF сохраняется как есть."""
+        frames = [Image.new('P', (20, 20), color) for color in (1, 2)]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        self.create_post(
+            SimpleUploadedFile('anim.gif', buffer.getvalue(), 'image/gif')
+        )
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertTrue(image.is_animated)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_decompression_bomb_rejected(self):
+        """Картинка со слишком большим разрешением отклоняется."""
+        response = self.create_post(image_upload('bomb.png', (20, 20), 'PNG'))
+        self.assertFormError(
+            response,
+            'form',
+            'image',
+            'Слишком большое разрешение картинки.',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_large_file_rejected(self):
+        """Слишком большой файл отклоняется."""
+        response = self.create_post(image_upload('big.jpg', (20, 20)))
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertFalse(Post.objects.exists())
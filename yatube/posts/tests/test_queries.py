@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import AuthorStats, Follow, TimelineEntry
+from ..sample_data import seed_posts
+from .utils import QueryBudgetMixin
+
+
+@override_settings(POSTS_TIMELINE_ENABLED=True, POSTS_TIMELINE_FANOUT_LIMIT=50)
+class ViewsQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Бюджеты запросов и строк для страниц posts при холодном кеше.
+
+    Читатель подписан на сотни авторов, а у одного из них подписчиков
+    больше POSTS_TIMELINE_FANOUT_LIMIT, поэтому лента подписок собирается
+    и из материализованной ленты, и запросом при чтении. Если тест упал
+    после изменения, проверьте, не появился ли N+1: в сообщении выводятся
+    все выполненные запросы.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.post = seed_posts(
+            authors=300, posts=1200, follows=300, followers=60
+        )
+        cls.group = cls.post.group
+        # Профиль самого активного автора, чтобы страница была полной.
+        cls.author = AuthorStats.objects.order_by(
+            '-posts_count'
+        ).first().user
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def pages(self):
+        return {
+            'index': reverse('posts:index'),
+            'group_posts': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ),
+        }
+
+    def test_seeded_feed(self):
+        """Лента читателя собирается и из таблицы, и при чтении."""
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 300
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertTrue(
+            AuthorStats.objects.filter(
+                user__following__user=self.reader,
+                followers_count__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+            ).exists()
+        )
+
+    def test_guest_pages(self):
+        """Страницы для гостей при пустом кеше."""
+        budgets = {
+            'index': (3, 30),
+            'group_posts': (4, 21),
+            # Статистика автора читается отдельно, после версии страницы.
+            'profile': (5, 22),
+            'post_detail': (4, 47),
+        }
+        for name, url in self.pages().items():
+            queries, rows = budgets[name]
+            with self.subTest(page=name):
+                cache.clear()
+                with self.assertQueryBudget(queries, rows):
+                    self.guest_client.get(url)
+
+    def test_guest_pages_from_cache(self):
+        """Повторный запрос гостя обходится проверкой свежести."""
+        for name, url in self.pages().items():
+            with self.subTest(page=name):
+                self.guest_client.get(url)
+                with self.assertQueryBudget(2, 0):
+                    self.guest_client.get(url)
+
+    def test_authorized_pages(self):
+        """Страницы для авторизованного пользователя при пустом кеше."""
+        budgets = {
+            'index': (4, 32),
+            'group_posts': (6, 23),
+            'profile': (6, 24),
+            'post_detail': (6, 49),
+            # Список авторов для версии ленты; дальше он берётся из кеша.
+            'follow_index': (5, 32),
+        }
+        pages = {
+            **self.pages(),
+            'follow_index': reverse('posts:follow_index'),
+        }
+        for name, url in pages.items():
+            queries, rows = budgets[name]
+            with self.subTest(page=name):
+                cache.clear()
+                with self.assertQueryBudget(queries, rows):
+                    self.reader_client.get(url)
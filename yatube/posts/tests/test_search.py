@@ -0,0 +1,163 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def create_post(self, text):
+        return Post.objects.create(
+            text=text, author=self.user, group=self.group
+        )
+
+    def found(self, query):
+        results = search.SearchResults(query)
+        return [post.text for post in results[:results.count()]]
+
+    def test_terms(self):
+        """Из запроса остаются только слова в нижнем регистре."""
+        self.assertEqual(
+            search.terms('Ёжик "в" тумане* OR -NEAR(x)'),
+            ['ежик', 'в', 'тумане', 'or', 'near', 'x'],
+        )
+        self.assertEqual(search.terms('  ... '), [])
+
+    def test_index_follows_posts(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        post = self.create_post('Ёжик в тумане')
+        self.assertEqual(self.found('ежик'), ['Ёжик в тумане'])
+        self.assertEqual(self.found('ТУМ'), ['Ёжик в тумане'])
+        post.text = 'Медвежонок на поляне'
+        post.save()
+        self.assertEqual(self.found('ежик'), [])
+        self.assertEqual(self.found('поляне'), ['Медвежонок на поляне'])
+        post.delete()
+        self.assertEqual(self.found('поляне'), [])
+
+    def test_comments_find_posts(self):
+        """Пост находится по тексту комментариев к нему."""
+        post = self.create_post('Первый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Отличный закат'
+        )
+        self.assertEqual(self.found('закат'), ['Первый пост'])
+        comment.delete()
+        self.assertEqual(self.found('закат'), [])
+
+    def test_all_words_and_ranking(self):
+        """Ищутся посты со всеми словами, чаще встречающиеся выше."""
+        self.create_post('кот ест суп днём')
+        self.create_post('кот ест, кот спит')
+        self.create_post('пёс спит')
+        self.assertEqual(
+            self.found('кот ест'), ['кот ест, кот спит', 'кот ест суп днём']
+        )
+        results = search.SearchResults('спит')
+        self.assertEqual(results.count(), 2)
+        self.assertEqual(len(results[1:2]), 1)
+
+    def test_view(self):
+        """Страница поиска показывает найденные посты постранично."""
+        for number in range(12):
+            self.create_post(f'Пост про поиск номер {number}')
+        self.create_post('Посторонний текст')
+        url = reverse('posts:search')
+        response = self.guest_client.get(url, {'q': 'поиск'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'posts/search.html')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 12)
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, 'href="?q=%D0%BF%D0%BE%D0%B8%D1%81'
+                                      '%D0%BA&amp;page=2"')
+        response = self.guest_client.get(url, {'q': 'поиск', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 2)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по индексу постов и комментариев."""
+        post = self.create_post('Осенний листопад')
+        self.create_post('Весенняя капель')
+        Comment.objects.create(
+            post=post, author=self.user, text='Красивый листопад'
+        )
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'листопад'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [post]
+        )
+        response = self.admin_client.get(
+            reverse('admin:posts_comment_changelist'), {'q': 'осенний'}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_rebuild(self):
+        """Команда пересобирает индекс из постов и комментариев."""
+        post = self.create_post('Старый текст')
+        Comment.objects.create(post=post, author=self.user, text='Отзыв')
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
+        self.assertEqual(self.found('новый'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(self.found('новый'), ['Новый текст'])
+        self.assertEqual(self.found('отзыв'), ['Новый текст'])
+
+    def test_migration_fills_index(self):
+        """Миграция создаёт и заполняет индекс своей копией схемы."""
+        post = self.create_post('Ёжик в тумане')
+        Comment.objects.create(post=post, author=self.user, text='Закат')
+        index = search.get_index(connection)
+        with connection.cursor() as cursor:
+            index.drop(cursor)
+        migration = import_module('posts.migrations.0009_search_index')
+        apps = MigrationLoader(connection).project_state(
+            ('posts', '0009_search_index')
+        ).apps
+        migration.create_search_index(
+            apps, SimpleNamespace(connection=connection)
+        )
+        self.assertEqual(self.found('ежик'), ['Ёжик в тумане'])
+        self.assertEqual(self.found('закат'), ['Ёжик в тумане'])
+        post.text = 'Медвежонок'
+        post.save()
+        self.assertEqual(self.found('ежик'), [])
+
+    def test_fallback_without_index(self):
+        """Без индекса для базы поиск работает через LIKE."""
+        self.create_post('Текст без индекса')
+        backends = search.BACKENDS.pop(connection.vendor)
+        self.addCleanup(search.BACKENDS.__setitem__, connection.vendor,
+                        backends)
+        self.assertEqual(self.found('индекса'), ['Текст без индекса'])
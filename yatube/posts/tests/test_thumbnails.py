@@ -0,0 +1,256 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, features
+
+from .. import thumbnails, variants
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_BACKGROUND_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=uploaded_gif()
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_generate_stores_urls(self):
+        """Миниатюры всех размеров строятся и сохраняются в посте."""
+        urls = thumbnails.submit(self.post.pk)
+        self.assertEqual(set(urls), set(settings.POSTS_THUMBNAIL_SIZES))
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.thumbnail_urls, urls)
+        path = urls['card'][len(settings.MEDIA_URL):]
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, path)))
+
+    def test_thumbnails_shared_by_same_image(self):
+        """Посты с одинаковой картинкой получают общие миниатюры."""
+        other = Post.objects.create(
+            text='Та же картинка', author=self.user, image=uploaded_gif()
+        )
+        self.assertEqual(other.image.name, self.post.image.name)
+        self.assertEqual(
+            thumbnails.generate(other.pk), thumbnails.generate(self.post.pk)
+        )
+
+    def test_pages_use_stored_urls(self):
+        """Ленты и страница поста выводят сохранённые URL миниатюр."""
+        Post.objects.filter(pk=self.post.pk).update(
+            thumbnails='{"card": "/media/cache/ready.jpg"}'
+        )
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, '/media/cache/ready.jpg')
+
+    def test_generate_skips_replaced_image(self):
+        """Миниатюры старой картинки не сохраняются после её замены."""
+        def replace_image(image):
+            Post.objects.filter(pk=self.post.pk).update(
+                image='posts/other.gif'
+            )
+            return {'card': '/media/cache/stale.jpg'}
+
+        with mock.patch.object(
+            thumbnails, 'make_thumbnails', side_effect=replace_image
+        ):
+            thumbnails.generate(self.post.pk)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).thumbnails, '')
+
+    def test_edit_with_new_image_resets_thumbnails(self):
+        """Новая картинка при редактировании сбрасывает старые миниатюры."""
+        Post.objects.filter(pk=self.post.pk).update(
+            thumbnails='{"card": "/media/cache/old.jpg"}'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый текст', 'image': uploaded_gif('new.gif')},
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.thumbnails, '')
+        self.assertEqual(post.text, 'Новый текст')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AttachThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        for number in range(5):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.user,
+                image=uploaded_gif(f'small{number}.gif'),
+            )
+        Post.objects.create(text='Пост без картинки', author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_missing_thumbnails_left_to_template(self):
+        """Ещё не построенные миниатюры не подставляются."""
+        posts = thumbnails.attach_thumbnails(Post.objects.all())
+        self.assertTrue(all(not post.thumbnail_urls for post in posts))
+
+    def test_page_resolved_in_one_query(self):
+        """Миниатюры всей страницы ищутся одним запросом без sorl.get."""
+        expected = {
+            post.pk: thumbnails.make_thumbnails(post.image)
+            for post in Post.objects.exclude(image='')
+        }
+        cache.clear()
+        posts = list(Post.objects.all())
+        with mock.patch.object(
+            thumbnails.default.kvstore, '_get_raw'
+        ) as get_raw, self.assertNumQueries(1):
+            thumbnails.attach_thumbnails(posts)
+        get_raw.assert_not_called()
+        for post in posts:
+            with self.subTest(post=post.text):
+                self.assertEqual(
+                    post.thumbnail_urls, expected.get(post.pk, {})
+                )
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            thumbnails.attach_thumbnails(posts)
+
+    def test_stored_urls_not_looked_up(self):
+        """Посты с сохранёнными миниатюрами не требуют поиска."""
+        Post.objects.update(thumbnails='{"card": "/media/cache/ready.jpg"}')
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(0):
+            thumbnails.attach_thumbnails(posts)
+        self.assertEqual(
+            posts[0].thumbnail_urls, {'card': '/media/cache/ready.jpg'}
+        )
+
+
+def uploaded_jpeg(name='photo.jpg', size=(1000, 500)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с фото', author=self.user, image=uploaded_jpeg()
+        )
+
+    def test_build_widths_not_larger_than_source(self):
+        """Варианты строятся в ширинах не больше исходной картинки."""
+        srcsets = variants.build(self.post.image.name)
+        self.assertIn('jpeg', srcsets)
+        widths = [
+            int(item.rsplit(' ', 1)[1][:-1])
+            for item in srcsets['jpeg'].split(', ')
+        ]
+        self.assertEqual(widths, [480, 960])
+        url = srcsets['jpeg'].split(' ', 1)[0]
+        path = os.path.join(TEMP_MEDIA_ROOT, url[len(settings.MEDIA_URL):])
+        with Image.open(path) as image:
+            self.assertEqual(image.size, (480, 170))
+
+    @skipUnless(features.check('webp'), 'Pillow собран без WebP')
+    def test_build_webp(self):
+        """При поддержке WebP строятся и варианты в WebP."""
+        self.assertIn('webp', variants.build(self.post.image.name))
+
+    @override_settings(POSTS_IMAGE_VARIANT_FORMATS=('bmp', 'jpeg'))
+    def test_unknown_formats_skipped(self):
+        """Неизвестные и неподдерживаемые форматы пропускаются."""
+        self.assertEqual(variants.available_formats(), ['jpeg'])
+
+    def test_srcset_rendered(self):
+        """Страница поста выводит srcset готовых вариантов."""
+        thumbnails.generate(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(
+            response, f'srcset="{post.image_srcsets["jpeg"]}"'
+        )
+
+    def test_backfill_command(self):
+        """Команда строит варианты для постов, где их ещё нет."""
+        Post.objects.create(text='Без картинки', author=self.user)
+        other = Post.objects.create(
+            text='Другое фото', author=self.user,
+            image=uploaded_jpeg('other.jpg', (900, 500)),
+        )
+        out = io.StringIO()
+        with mock.patch(
+            'posts.management.commands.backfill_image_variants.CHUNK_SIZE', 1
+        ):
+            call_command('backfill_image_variants', workers=1, stdout=out)
+        self.assertIn('Варианты построены: 2, ошибок: 0', out.getvalue())
+        for post in Post.objects.filter(pk__in=(self.post.pk, other.pk)):
+            self.assertIn('jpeg', post.image_srcsets)
+            self.assertEqual(post.thumbnails, '')
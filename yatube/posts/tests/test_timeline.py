@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(
+    POSTS_TIMELINE_ENABLED=True,
+    POSTS_TIMELINE_LENGTH=5,
+    POSTS_TIMELINE_FANOUT_LIMIT=1,
+)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.another_reader = User.objects.create_user(username='TestReader2')
+        cls.post = Post.objects.create(text='Старый пост', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.another_client = Client()
+        self.another_client.force_login(self.another_reader)
+        cache.clear()
+
+    def follow(self, client, author):
+        client.get(
+            reverse('posts:profile_follow', kwargs={'username': author})
+        )
+
+    def feed(self, client):
+        response = client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту посты автора."""
+        self.follow(self.reader_client, self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=self.post
+            ).exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [self.post])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост раскладывается в ленты подписчиков."""
+        self.follow(self.reader_client, self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [post, self.post])
+
+    def test_unfollow_clears_timeline(self):
+        """После отписки посты автора пропадают из ленты."""
+        self.follow(self.reader_client, self.author)
+        self.reader_client.get(
+            reverse(
+                'posts:profile_unfollow', kwargs={'username': self.author}
+            )
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [])
+
+    def test_popular_author_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении ленты."""
+        self.follow(self.reader_client, self.author)
+        self.follow(self.another_client, self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=post).exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [post, self.post])
+        self.assertEqual(self.feed(self.another_client), [post, self.post])
+
+    def test_timeline_trimmed(self):
+        """Лента обрезается до заданной длины."""
+        self.follow(self.reader_client, self.author)
+        for number in range(10):
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(self.feed(self.reader_client)[-1].text, 'Пост 5')
+
+    def test_author_below_limit_backfilled(self):
+        """Посты автора остаются в ленте, когда он опускается до предела."""
+        self.follow(self.reader_client, self.author)
+        self.follow(self.another_client, self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        callbacks = []
+        with mock.patch('django.db.transaction.on_commit', callbacks.append):
+            self.another_client.get(
+                reverse(
+                    'posts:profile_unfollow', kwargs={'username': self.author}
+                )
+            )
+        # Раскладка ждёт коммита и не выполняется в запросе отписки.
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [post, self.post])
+        self.assertEqual(self.feed(self.another_client), [])
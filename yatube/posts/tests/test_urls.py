@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from ..models import Group, Post
@@ -34,6 +35,7 @@ class PostURLTests(TestCase):
             f'/group/{cls.group.slug}/': 'posts/group_list.html',
             f'/profile/{cls.user.username}/': 'posts/profile.html',
             f'/posts/{cls.post.id}/': 'posts/post_detail.html',
+            f'/posts/{cls.post.id}/comments/': 'posts/comments.html',
         }
         cls.authorized_urls = {
             f'/posts/{cls.post.id}/edit/': 'posts/create_post.html',
@@ -52,6 +54,8 @@ class PostURLTests(TestCase):
         }
 
     def setUp(self):
+        # Страницы для гостей кешируются целиком, между тестами их сбрасываем.
+        cache.clear()
         self.guest_client = Client()
         self.authorized_not_author_client = Client()
         self.authorized_client = Client()
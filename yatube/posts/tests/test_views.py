@@ -1,14 +1,21 @@
 import shutil
 import tempfile
+import time
+from unittest import mock
 
+from core.routers import read_from_replicas
+from core.templatetags.user_filters import page_window
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import router
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Follow, Group, Post
+from posts import versions
+from posts.counters import recount_counters
+from posts.models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -117,7 +124,7 @@ class PostPagesTests(TestCase):
 
     def test_post_detail_page_show_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
-        response = self.guest_client.get(
+        response = self.authorized_client.get(
             reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
         post = response.context.get('post')
         post_context = {
@@ -171,7 +178,7 @@ class PostPagesTests(TestCase):
             group=another_group,
         )
         post_count = Post.objects.filter(group=another_group).count()
-        response = self.guest_client.get(
+        response = self.authorized_client.get(
             reverse(
                 'posts:group_list', kwargs={'slug': self.group.slug}
             )
@@ -207,9 +214,11 @@ class PaginatorViewsTest(TestCase):
                 for post in range(cls.POST_COUNT)
             ]
         )
+        recount_counters()
 
     def setUp(self):
         self.unauthorized_client = Client()
+        cache.clear()
 
     def test_paginator_on_pages(self):
         """Пагинации на страницах."""
@@ -229,6 +238,163 @@ class PaginatorViewsTest(TestCase):
                     self.POST_COUNT_ON_2_PAGE)
 
 
+class FeedCountCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.another_group = Group.objects.create(
+            title='Другая тестовая группа',
+            slug='another-test-slug',
+            description='Другое тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        # Авторизованный клиент: страницы гостей кешируются целиком.
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def get_count(self, url):
+        response = self.authorized_client.get(url)
+        return response.context['page_obj'].paginator.count
+
+    def test_count_is_cached(self):
+        """Число постов главной страницы берётся из кеша."""
+        url = reverse('posts:index')
+        self.assertEqual(self.get_count(url), 1)
+        Post.objects.bulk_create(
+            [Post(text='Без сигналов', author=self.user, group=self.group)]
+        )
+        self.assertEqual(self.get_count(url), 1)
+
+    def test_count_invalidated_on_post_changes(self):
+        """Счётчики лент сбрасываются при создании, переносе и удалении."""
+        urls = {
+            'index': reverse('posts:index'),
+            'group': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'another_group': reverse(
+                'posts:group_list', kwargs={'slug': self.another_group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ),
+        }
+        for url in urls.values():
+            self.get_count(url)
+        post = Post.objects.create(
+            text='Новый пост', author=self.user, group=self.group
+        )
+        expected = {'index': 2, 'group': 2, 'another_group': 0, 'profile': 2}
+        for name, count in expected.items():
+            with self.subTest(feed=name):
+                self.assertEqual(self.get_count(urls[name]), count)
+        post.group = self.another_group
+        post.save()
+        self.assertEqual(self.get_count(urls['group']), 1)
+        self.assertEqual(self.get_count(urls['another_group']), 1)
+        post.delete()
+        expected = {'index': 1, 'group': 1, 'another_group': 0, 'profile': 1}
+        for name, count in expected.items():
+            with self.subTest(feed=name):
+                self.assertEqual(self.get_count(urls[name]), count)
+
+    def test_page_window(self):
+        """Пагинатор выводит окно номеров страниц вокруг текущей."""
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {number}', author=self.user)
+             for number in range(99)]
+        )
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'page': 5}
+        )
+        self.assertEqual(
+            list(page_window(response.context['page_obj'])),
+            [3, 4, 5, 6, 7],
+        )
+
+
+@override_settings(POSTS_PAGINATION_MODE='cursor')
+class CursorPaginatorViewsTest(TestCase):
+    POST_COUNT = 13
+    POST_COUNT_ON_1_PAGE = 10
+    POST_COUNT_ON_2_PAGE = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            [Post(
+                text=f'Тестовый пост: {post}',
+                author=cls.user,
+                group=cls.group,
+            )
+                for post in range(cls.POST_COUNT)
+            ]
+        )
+        # одинаковая дата: порядок должен держаться на id
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+
+    def setUp(self):
+        self.unauthorized_client = Client()
+        cache.clear()
+
+    def test_cursor_paginator_on_pages(self):
+        """Курсорная пагинация на страницах."""
+        url_pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for url in url_pages:
+            with self.subTest(url=url):
+                first_page = self.unauthorized_client.get(
+                    url).context['page_obj']
+                self.assertEqual(len(first_page), self.POST_COUNT_ON_1_PAGE)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.unauthorized_client.get(
+                    url, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page), self.POST_COUNT_ON_2_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    set(first_page) & set(second_page), set()
+                )
+                back_page = self.unauthorized_client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.unauthorized_client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), self.POST_COUNT_ON_1_PAGE)
+        self.assertFalse(page_obj.has_previous())
+
+
 class FollowViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -359,7 +525,7 @@ class CacheTests(TestCase):
         first_response = self.authorized_client.get(reverse('posts:index'))
         first_post = first_response.content
 
-        self.post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Изменено в обход')
 
         second_response = self.authorized_client.get(reverse('posts:index'))
         second_posts = second_response.content
@@ -371,3 +537,449 @@ class CacheTests(TestCase):
         third_posts = third_response.content
 
         self.assertNotEqual(third_posts, first_post)
+
+    def warm_up(self, *urls):
+        for url in urls:
+            self.authorized_client.get(url)
+
+    def assert_pages_contain(self, text, *urls):
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertIn(text, response.content.decode())
+
+    def test_cache_invalidated_on_changes(self):
+        """Кеш страниц сбрасывается при изменении поста, группы и автора."""
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post.group = group
+        self.post.save()
+        index_url = reverse('posts:index')
+        group_url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        profile_url = reverse('posts:profile', kwargs={'username': self.user})
+
+        self.warm_up(index_url, group_url, profile_url)
+        self.post.text = 'Новый текст поста'
+        self.post.save()
+        self.assert_pages_contain(
+            'Новый текст поста', index_url, group_url, profile_url
+        )
+
+        self.warm_up(index_url, group_url)
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        self.assert_pages_contain('Новое имя', index_url, group_url)
+
+        self.warm_up(index_url, profile_url)
+        group.slug = 'new-slug'
+        group.save()
+        self.assert_pages_contain('new-slug', index_url, profile_url)
+
+    def test_cache_invalidated_on_delete(self):
+        """Удалённый пост сразу пропадает с главной страницы."""
+        self.authorized_client.get(reverse('posts:index'))
+        self.post.delete()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotIn(self.post.text, response.content.decode())
+
+
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='TestAuthor')
+        cls.reader = User.objects.create_user(username='TestReader')
+        cls.another_reader = User.objects.create_user(username='TestReader2')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.another_client = Client()
+        self.another_client.force_login(self.another_reader)
+
+    def get_feed(self, client):
+        return client.get(reverse('posts:follow_index')).content.decode()
+
+    def test_follow_page_cached(self):
+        """Лента подписок берётся из кеша, пока данные не менялись."""
+        first = self.get_feed(self.reader_client)
+        Post.objects.filter(pk=self.post.pk).update(text='Изменено в обход')
+        self.assertEqual(self.get_feed(self.reader_client), first)
+
+    def test_follow_page_not_shared_between_users(self):
+        """Закешированная лента одного пользователя не видна другому."""
+        self.assertIn(self.post.text, self.get_feed(self.reader_client))
+        self.assertNotIn(self.post.text, self.get_feed(self.another_client))
+
+    def test_new_post_refreshes_followers_feed(self):
+        """Новый пост автора сразу появляется в ленте подписчика."""
+        self.get_feed(self.reader_client)
+        Post.objects.create(text='Свежий пост автора', author=self.author)
+        self.assertIn('Свежий пост автора', self.get_feed(self.reader_client))
+
+    def test_post_does_not_touch_followers(self):
+        """Пост меняет версии автора, а не ленты каждого подписчика."""
+        self.get_feed(self.reader_client)
+        with mock.patch.object(
+            cache, 'set_many', wraps=cache.set_many
+        ) as set_many:
+            Post.objects.create(text='Свежий пост автора', author=self.author)
+        keys = [key for call in set_many.call_args_list for key in call[0][0]]
+        self.assertNotIn(
+            versions.VERSION_KEY.format(
+                name=versions.follow_feed(self.reader.pk)
+            ),
+            keys,
+        )
+        self.assertIn('Свежий пост автора', self.get_feed(self.reader_client))
+
+    def test_group_change_refreshes_feed(self):
+        """Переименование группы сразу видно в ленте подписок."""
+        group = Group.objects.create(title='Группа', slug='old-slug')
+        self.post.group = group
+        self.post.save()
+        self.get_feed(self.reader_client)
+        group.slug = 'new-slug'
+        group.save()
+        self.assertIn('new-slug', self.get_feed(self.reader_client))
+
+    def test_follow_refreshes_feed(self):
+        """Подписка и отписка сразу меняют ленту."""
+        self.assertNotIn(self.post.text, self.get_feed(self.another_client))
+        self.another_client.get(
+            reverse('posts:profile_follow', kwargs={'username': self.author})
+        )
+        self.assertIn(self.post.text, self.get_feed(self.another_client))
+        self.another_client.get(
+            reverse(
+                'posts:profile_unfollow', kwargs={'username': self.author}
+            )
+        )
+        self.assertNotIn(self.post.text, self.get_feed(self.another_client))
+
+
+@override_settings(DATABASE_REPLICAS=('replica_1',), DATABASE_PIN_SECONDS=10)
+class ReplicaLagCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def read_from(self, name):
+        with read_from_replicas():
+            versions.get_version(name)
+            return router.db_for_read(Post)
+
+    def test_recent_change_read_from_primary(self):
+        """Недавно сменённая версия переводит чтение на основную базу."""
+        versions.bump(versions.INDEX)
+        self.assertEqual(self.read_from(versions.INDEX), 'default')
+        with mock.patch('posts.versions.time') as clock:
+            clock.time.return_value = time.time() + 60
+            self.assertEqual(self.read_from(versions.INDEX), 'replica_1')
+
+    def test_bumped_again_on_commit(self):
+        """Версия меняется ещё раз после коммита транзакции."""
+        with mock.patch('posts.versions.transaction.on_commit') as on_commit:
+            versions.bump(versions.INDEX)
+        version = versions.get_version(versions.INDEX)
+        callback, = on_commit.call_args[0]
+        callback()
+        self.assertNotEqual(versions.get_version(versions.INDEX), version)
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_guest_pages_have_validators(self):
+        """Страницы для гостей отдаются с ETag и Last-Modified."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        """Совпавший If-None-Match даёт ответ 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_guest_page_cached(self):
+        """Повторный запрос гостя отдаётся из кеша без рендеринга."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Изменено в обход')
+        second = self.guest_client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertIsNone(second.context)
+
+    def test_extra_params_share_cache(self):
+        """Посторонние параметры запроса не создают новые копии страницы."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        for query in ('?utm=1', '?utm=2&ref=feed'):
+            with self.subTest(query=query):
+                response = self.guest_client.get(url + query)
+                self.assertEqual(response['ETag'], etag)
+                self.assertIsNone(response.context)
+        response = self.guest_client.get(url + '?page=2')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_authorized_pages_not_cached(self):
+        """Страницы авторизованных пользователей не кешируются целиком."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotIn('ETag', response)
+        self.assertIsNotNone(response.context)
+
+    def test_changes_refresh_guest_pages(self):
+        """Новый пост, правка и комментарий меняют ETag страниц."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotEqual(response['ETag'], etags[url])
+                self.assertContains(response, 'Исправленный пост')
+        detail_url = self.urls[-1]
+        etag = self.guest_client.get(detail_url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        response = self.guest_client.get(detail_url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_follow_refreshes_guest_profiles(self):
+        """Подписка и отписка меняют счётчики в профилях обоих."""
+        reader = User.objects.create_user(username='TestReader')
+        author_url = reverse('posts:profile', args=(self.user.username,))
+        reader_url = reverse('posts:profile', args=(reader.username,))
+        etag = self.guest_client.get(author_url)['ETag']
+        self.guest_client.get(reader_url)
+        Follow.objects.follow(reader, self.user)
+        response = self.guest_client.get(
+            author_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(self.guest_client.get(reader_url), 'подписок: 1')
+        Follow.objects.unfollow(reader, self.user)
+        self.assertContains(
+            self.guest_client.get(author_url), 'Подписчиков: 0'
+        )
+        self.assertContains(self.guest_client.get(reader_url), 'подписок: 0')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.another_user = User.objects.create_user(username='AnotherUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.another_client = Client()
+        self.another_client.force_login(self.another_user)
+
+    def test_not_modified_for_authorized(self):
+        """Авторизованный пользователь получает 304 без рендеринга."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                # Первый ответ выдаёт CSRF-cookie, она входит в ETag.
+                self.authorized_client.get(url)
+                response = self.authorized_client.get(url)
+                self.assertIn('private', response['Cache-Control'])
+                with self.assertNumQueries(4):
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        """If-Modified-Since не раньше последнего поста даёт 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_edit_moves_last_modified(self):
+        """После правки поста старый If-Modified-Since не даёт 304."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        last_modified = self.authorized_client.get(url)['Last-Modified']
+        with mock.patch('posts.versions.time') as clock:
+            clock.time.return_value = time.time() + 10
+            self.post.text = 'Исправленный пост'
+            self.post.save()
+        response = self.authorized_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_etag_depends_on_user(self):
+        """ETag одной страницы различается у разных пользователей."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                response = self.another_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = self.urls[-1]
+        self.authorized_client.get(url)
+        etag = self.authorized_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.another_user, text='Комментарий'
+        )
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+
+@override_settings(POSTS_COMMENTS_PER_PAGE=5)
+class CommentsViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def add_comments(self, count):
+        start = self.post.comments.count()
+        for i in range(start, start + count):
+            author = User.objects.create_user(username=f'commenter{i}')
+            Comment.objects.create(
+                post=self.post, author=author, text=f'Комментарий {i}'
+            )
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов страницы поста не зависит от комментариев."""
+        self.add_comments(2)
+        with self.assertNumQueries(4):
+            self.guest_client.get(self.detail_url)
+        self.add_comments(8)
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.guest_client.get(self.detail_url)
+
+    def test_comments_paginated(self):
+        """На странице поста первая порция комментариев и ссылка на ещё."""
+        self.add_comments(7)
+        response = self.guest_client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertTrue(comments.has_next())
+        more_url = reverse(
+            'posts:post_comments', kwargs={'post_id': self.post.pk}
+        )
+        self.assertContains(
+            response, f'{more_url}?cursor={comments.next_cursor}'
+        )
+        response = self.guest_client.get(
+            more_url,
+            {'cursor': comments.next_cursor},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertTemplateNotUsed(response, 'base.html')
+        rest = response.context['comments']
+        self.assertEqual(len(rest), 2)
+        self.assertFalse(rest.has_next())
+        shown = {comment.pk for comment in [*comments, *rest]}
+        self.assertEqual(
+            shown, set(self.post.comments.values_list('pk', flat=True))
+        )
+
+    def test_comments_fragment_cached_separately(self):
+        """AJAX-фрагмент комментариев не подменяет закешированную страницу."""
+        self.add_comments(7)
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        fragment = self.guest_client.get(
+            url, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertIn('X-Requested-With', fragment['Vary'])
+        response = self.guest_client.get(url)
+        self.assertNotEqual(response['ETag'], fragment['ETag'])
+        self.assertTemplateUsed(response, 'base.html')
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=fragment['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_comments_endpoint_404(self):
+        """Для несуществующего поста список комментариев отдаёт 404."""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_init
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudget:
+    """Считает SQL-запросы и объекты моделей, созданные внутри блока.
+
+    Объекты считаются по сигналу post_init, поэтому в число строк
+    попадают и модели из select_related, и пустые экземпляры форм.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.captured = CaptureQueriesContext(connections[using])
+        self.rows = 0
+
+    def _count_row(self, sender, **kwargs):
+        self.rows += 1
+
+    @property
+    def queries(self):
+        return len(self.captured)
+
+    def __enter__(self):
+        self.captured.__enter__()
+        post_init.connect(self._count_row, weak=False, dispatch_uid=id(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        post_init.disconnect(dispatch_uid=id(self))
+        self.captured.__exit__(exc_type, exc_value, traceback)
+
+    def report(self):
+        return '\n'.join(
+            f'{number}. {query["sql"]}'
+            for number, query in enumerate(self.captured, start=1)
+        )
+
+
+class QueryBudgetMixin:
+    @contextmanager
+    def assertQueryBudget(self, queries, rows):
+        """Падает, если блок выполнил больше запросов или строк."""
+        with QueryBudget() as budget:
+            yield budget
+        self.assertLessEqual(
+            budget.queries,
+            queries,
+            f'Превышен бюджет запросов:\n{budget.report()}',
+        )
+        self.assertLessEqual(
+            budget.rows,
+            rows,
+            f'Превышен бюджет строк ({budget.rows} > {rows}):\n'
+            f'{budget.report()}',
+        )
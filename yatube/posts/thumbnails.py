@@ -0,0 +1,161 @@
+"""Генерация миниатюр картинок постов вне потока запроса.
+
+После сохранения поста с новой картинкой миниатюры всех размеров из
+POSTS_THUMBNAIL_SIZES и адаптивные варианты из posts.variants строятся
+в фоновом пуле потоков (posts.background), а их URL записываются в
+Post.thumbnails и Post.image_variants. Шаблоны берут готовые URL и обращаются к
+sorl-thumbnail только для постов, миниатюры которых ещё не готовы.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore
+
+from . import background, variants, versions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def make_thumbnails(image):
+    urls = {}
+    for alias, options in settings.POSTS_THUMBNAIL_SIZES.items():
+        options = dict(options)
+        geometry = options.pop('geometry')
+        urls[alias] = get_thumbnail(image, geometry, **options).url
+    return urls
+
+
+def save_images(post, **fields):
+    """Сохраняет поля картинки, если её не успели заменить.
+
+    Пока строились миниатюры, картинку могли поменять: тогда результат
+    не сохраняется, новую картинку обработает её собственная задача.
+    """
+    updated = Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        **fields
+    )
+    if updated:
+        versions.bump_post_pages(post)
+    return bool(updated)
+
+
+def generate(post_id):
+    """Строит миниатюры и адаптивные варианты картинки поста."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'image', 'author_id', 'group_id'
+    ).first()
+    if post is None or not post.image:
+        return None
+    urls = make_thumbnails(post.image)
+    srcsets = variants.build(post.image.name, post.image.storage)
+    save_images(
+        post,
+        thumbnails=json.dumps(urls),
+        image_variants=json.dumps(srcsets),
+    )
+    return urls
+
+
+def _generate_logged(post_id):
+    try:
+        return generate(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры поста %s', post_id)
+        return None
+
+
+def submit(post_id):
+    return background.submit(_generate_logged, post_id)
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр в очередь после коммита транзакции."""
+    if post.image:
+        transaction.on_commit(lambda: submit(post.pk))
+
+
+def _thumbnail_file(image, geometry, options):
+    """Файл миниатюры, который построил бы get_thumbnail, без обращений к
+    хранилищу: имя зависит только от исходного файла и параметров."""
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def _stored_keys(keys):
+    """Какие из ключей миниатюр уже есть в key-value store sorl.
+
+    Для cached_db хранилища всё читается одним get_many из кеша и одним
+    запросом к базе для промахов, для остальных хранилищ по одному.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {key for key in keys if kvstore._get(key)}
+    raw_keys = {add_prefix(key): key for key in keys}
+    found = kvstore.cache.get_many(list(raw_keys))
+    missing = [raw_key for raw_key in raw_keys if raw_key not in found]
+    if missing:
+        from_db = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        kvstore.cache.set_many(
+            from_db, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        found.update(from_db)
+    return {
+        raw_keys[raw_key]
+        for raw_key, value in found.items()
+        if value != EMPTY_VALUE
+    }
+
+
+def attach_thumbnails(posts):
+    """Заполняет post.thumbnail_urls у всех постов одним поиском.
+
+    Для постов, чьи миниатюры ещё не сохранены в Post.thumbnails, URL
+    ищутся в key-value store sorl пакетом. Не найденные размеры шаблон
+    построит сам через тег thumbnail.
+    """
+    posts = list(posts)
+    wanted = []
+    for post in posts:
+        if not post.image:
+            continue
+        for alias, options in settings.POSTS_THUMBNAIL_SIZES.items():
+            if alias in post.thumbnail_urls:
+                continue
+            options = dict(options)
+            geometry = options.pop('geometry')
+            wanted.append(
+                (post, alias, _thumbnail_file(post.image, geometry, options))
+            )
+    if wanted:
+        stored = _stored_keys([thumbnail.key for _, _, thumbnail in wanted])
+        for post, alias, thumbnail in wanted:
+            if thumbnail.key in stored:
+                post.thumbnail_urls = {
+                    **post.thumbnail_urls, alias: thumbnail.url
+                }
+    return posts
@@ -0,0 +1,151 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается в ленты подписчиков автора, поэтому
+follow_index читает готовый список вместо соединения posts_follow и
+posts_post. Посты авторов, у которых подписчиков больше
+POSTS_TIMELINE_FANOUT_LIMIT, не раскладываются и подмешиваются при
+чтении ленты (fan-out on read). Когда после отписки автор опускается до
+предела, его последние посты раскладываются в ленты всех подписчиков,
+иначе посты, написанные в режиме fan-out on read, пропали бы из лент.
+Эта раскладка идёт в фоновом пуле после коммита, а не в запросе
+отписавшегося пользователя.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import background
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def is_enabled():
+    return settings.POSTS_TIMELINE_ENABLED
+
+
+def _is_fanned_out(author_id):
+    return not AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def trim(user_ids):
+    """Обрезает ленты пользователей до POSTS_TIMELINE_LENGTH записей.
+
+    У каждой ленты удаляются записи старше POSTS_TIMELINE_LENGTH-й одним
+    DELETE: подзапрос с OFFSET идёт по индексу (user, -pub_date) и читает
+    только эту ленту, а не считает записи всех подписчиков.
+    """
+    length = settings.POSTS_TIMELINE_LENGTH
+    for user_id in user_ids:
+        stale = TimelineEntry.objects.filter(user_id=user_id).order_by(
+            '-pub_date', '-post_id'
+        ).values('pk')[length:]
+        TimelineEntry.objects.filter(pk__in=stale).delete()
+
+
+def fan_out_post(post):
+    if not is_enabled() or not _is_fanned_out(post.author_id):
+        return
+    user_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def _add_posts(user_ids, author_id):
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list(
+            'pk', 'pub_date'
+        )[:settings.POSTS_TIMELINE_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id in user_ids
+            for pk, pub_date in posts
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(user_ids)
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if is_enabled() and _is_fanned_out(author_id):
+        _add_posts([user_id], author_id)
+
+
+def remove_author(user_id, author_id):
+    if not is_enabled():
+        return
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    dropped_to_limit = AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.POSTS_TIMELINE_FANOUT_LIMIT,
+    ).exists()
+    if dropped_to_limit:
+        transaction.on_commit(
+            lambda: background.submit(backfill_followers, author_id)
+        )
+
+
+def backfill_followers(author_id):
+    """Раскладывает последние посты автора в ленты всех подписчиков."""
+    try:
+        if _is_fanned_out(author_id):
+            _add_posts(
+                list(
+                    Follow.objects.filter(author_id=author_id)
+                    .values_list('user_id', flat=True)
+                ),
+                author_id,
+            )
+    except Exception:
+        logger.exception(
+            'Не удалось разложить посты автора %s по лентам', author_id
+        )
+
+
+def rebuild(user_ids=None):
+    followers = Follow.objects.order_by()
+    if user_ids is not None:
+        followers = followers.filter(user_id__in=user_ids)
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    else:
+        TimelineEntry.objects.all().delete()
+    for user_id, author_id in followers.values_list('user_id', 'author_id'):
+        add_author(user_id, author_id)
+
+
+def follow_posts(user):
+    """Посты ленты подписок пользователя."""
+    if not is_enabled():
+        return Post.objects.filter(author__following__user=user)
+    fanned_in = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=(
+            settings.POSTS_TIMELINE_FANOUT_LIMIT
+        ),
+    ).values('author_id')
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=fanned_in)
+    )
@@ -0,0 +1,154 @@
+"""Обработка картинок, загруженных в посты.
+
+Размеры картинки проверяются по заголовку файла, до декодирования
+пикселей, поэтому "бомбы декомпрессии" отклоняются сразу. Затем
+картинка поворачивается по EXIF, уменьшается до
+POSTS_IMAGE_MAX_DIMENSIONS и пересохраняется без метаданных во
+временный файл на диске.
+"""
+import os
+import shutil
+import tempfile
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Метаданные, без которых картинка отобразится неправильно.
+KEEP_INFO = ('icc_profile', 'transparency')
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+# Форматы, в которых анимация сохраняется как есть.
+ANIMATED_FORMATS = ('GIF', 'PNG', 'WEBP')
+
+# MPO — это JPEG с превью в том же файле (MPF), у фотографий с
+# телефона он встречается часто. Сохраняем только основной кадр.
+FORMAT_ALIASES = {'MPO': 'JPEG'}
+
+# Режимы, которые умеет записывать PNG.
+PNG_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA')
+
+
+def _save_options(image_format):
+    if image_format == 'JPEG':
+        return {
+            'quality': settings.POSTS_IMAGE_JPEG_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if image_format == 'WEBP':
+        return {'quality': settings.POSTS_IMAGE_JPEG_QUALITY, 'method': 4}
+    if image_format in ('PNG', 'GIF'):
+        return {'optimize': True}
+    return None
+
+
+def _convert(image, image_format, info):
+    """Переводит картинку в режим, который умеет записывать формат."""
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        mode = 'RGB'
+    elif image_format != 'PNG' or image.mode in PNG_MODES:
+        return image
+    elif 'A' in image.getbands() or 'transparency' in info:
+        mode = 'RGBA'
+    elif len(image.getbands()) == 1:
+        # Одноканальные F, I и I;16 сводятся к оттенкам серого.
+        mode = 'L'
+    else:
+        # CMYK, YCbCr, LAB, HSV.
+        mode = 'RGB'
+    info.pop('transparency', None)
+    return image.convert(mode)
+
+
+def _open(upload):
+    upload.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(upload)
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        image = None
+    if image is None or (
+        image.width * image.height > settings.POSTS_IMAGE_MAX_PIXELS
+    ):
+        raise ValidationError(
+            'Слишком большое разрешение картинки.',
+            code='too_many_pixels',
+        )
+    return image
+
+
+def _temporary_upload(name, content_type):
+    # Безымянный временный файл: хранилище скопирует его, а не будет
+    # перемещать, как TemporaryUploadedFile.
+    return UploadedFile(
+        tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR),
+        name,
+        content_type,
+    )
+
+
+def _rewind(output):
+    output.size = output.tell()
+    output.seek(0)
+    return output
+
+
+def normalize_image(upload):
+    """Возвращает обработанную копию загруженной картинки."""
+    if upload.size > settings.POSTS_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Размер файла не должен превышать %(limit)s.',
+            code='file_too_large',
+            params={
+                'limit': filesizeformat(settings.POSTS_IMAGE_MAX_UPLOAD_SIZE)
+            },
+        )
+    image = _open(upload)
+    max_width, max_height = settings.POSTS_IMAGE_MAX_DIMENSIONS
+    if image.format in ANIMATED_FORMATS and getattr(
+        image, 'is_animated', False
+    ):
+        # Анимацию не пересобираем, только ограничиваем её размеры.
+        if image.width > max_width or image.height > max_height:
+            raise ValidationError(
+                'Анимированная картинка должна быть не больше '
+                '%(width)s×%(height)s.',
+                code='animation_too_large',
+                params={'width': max_width, 'height': max_height},
+            )
+        output = _temporary_upload(upload.name, Image.MIME[image.format])
+        upload.seek(0)
+        shutil.copyfileobj(upload, output)
+        return _rewind(output)
+    image_format = FORMAT_ALIASES.get(image.format, image.format)
+    options = _save_options(image_format)
+    if options is None:
+        image_format, options = 'PNG', _save_options('PNG')
+    info = {key: image.info[key] for key in KEEP_INFO if key in image.info}
+    stem, extension = os.path.splitext(os.path.basename(upload.name))
+    if Image.registered_extensions().get(extension.lower()) != image_format:
+        extension = EXTENSIONS[image_format]
+    output = _temporary_upload(
+        f'{stem}{extension}', Image.MIME[image_format]
+    )
+    try:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_width, max_height), Image.LANCZOS)
+        image = _convert(image, image_format, info)
+        image.info = info
+        if 'icc_profile' in info:
+            # JPEG и WebP берут профиль только из параметров save().
+            options['icc_profile'] = info['icc_profile']
+        image.save(output, image_format, **options)
+    except (OSError, ValueError):
+        output.close()
+        raise ValidationError(
+            'Не удалось обработать картинку.', code='invalid_image'
+        )
+    return _rewind(output)
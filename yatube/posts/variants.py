@@ -0,0 +1,111 @@
+"""Варианты картинки поста разной ширины в современных форматах.
+
+Из картинки вырезается та же карточка, что показывают ленты, и
+сохраняется в нескольких ширинах POSTS_IMAGE_VARIANT_WIDTHS для каждого
+формата из POSTS_IMAGE_VARIANT_FORMATS, который умеет записывать Pillow.
+build() не обращается к базе, поэтому её можно выполнять в отдельных
+процессах.
+"""
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANT_PATH = 'variants/{digest}/{width}.{extension}'
+
+# Тег EXIF с ориентацией снимка.
+ORIENTATION = 0x0112
+
+FORMATS = {
+    'avif': ('AVIF', {'quality': 60}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'progressive': True}),
+}
+
+
+def available_formats():
+    """Форматы из настроек, которые поддерживает установленный Pillow."""
+    Image.init()
+    return [
+        name for name in settings.POSTS_IMAGE_VARIANT_FORMATS
+        if name in FORMATS and FORMATS[name][0] in Image.SAVE
+    ]
+
+
+def _widths(source_width):
+    """Ширины вариантов не больше исходной, но хотя бы одна."""
+    widths = [
+        width for width in settings.POSTS_IMAGE_VARIANT_WIDTHS
+        if width <= source_width
+    ]
+    return widths or [min(settings.POSTS_IMAGE_VARIANT_WIDTHS)]
+
+
+def _oriented_width(image):
+    """Ширина картинки после поворота по EXIF, без декодирования."""
+    if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):
+        return image.height
+    return image.width
+
+
+def _prepare(source):
+    source.load()
+    source = ImageOps.exif_transpose(source)
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert(
+            'RGBA' if 'transparency' in source.info else 'RGB'
+        )
+    return source
+
+
+def _save_variant(source, name, width, path):
+    pillow_format, options = FORMATS[name]
+    ratio_width, ratio_height = settings.POSTS_IMAGE_VARIANT_RATIO
+    height = max(round(width * ratio_height / ratio_width), 1)
+    image = source.convert('RGB') if name == 'jpeg' else source
+    resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, pillow_format, **options)
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def build(image_name, storage=None, overwrite=False):
+    """Строит варианты картинки и возвращает {формат: srcset}.
+
+    Имена вариантов зависят только от имени исходного файла, поэтому
+    готовые варианты переиспользуются, если не задан overwrite: при
+    хранении по хешу содержимого они общие у одинаковых картинок.
+    """
+    storage = storage or default_storage
+    digest = hashlib.sha1(image_name.encode()).hexdigest()
+    with storage.open(image_name) as file:
+        source = Image.open(file)
+        paths = {
+            (name, width): VARIANT_PATH.format(
+                digest=digest, width=width, extension=name
+            )
+            for name in available_formats()
+            for width in _widths(_oriented_width(source))
+        }
+        if not overwrite:
+            paths_to_build = [
+                key for key, path in paths.items()
+                if not default_storage.exists(path)
+            ]
+        else:
+            paths_to_build = list(paths)
+        if paths_to_build:
+            source = _prepare(source)
+    for name, width in paths_to_build:
+        _save_variant(source, name, width, paths[name, width])
+    variants = {}
+    for (name, width), path in paths.items():
+        variants.setdefault(name, []).append(
+            f'{default_storage.url(path)} {width}w'
+        )
+    return {name: ', '.join(srcset) for name, srcset in variants.items()}
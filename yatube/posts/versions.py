@@ -0,0 +1,184 @@
+"""Версии закешированных фрагментов лент.
+
+Версия входит в ключ фрагмента, поэтому при изменении данных достаточно
+сменить версию: старые фрагменты перестают читаться и вытесняются сами,
+а время жизни кеша можно делать сколь угодно большим.
+
+Запись меняет только версии своего автора, группы и поста. Страницы,
+собранные из многих авторов (лента подписок), объединяют их версии при
+чтении, поэтому пост популярного автора не перебирает его подписчиков.
+"""
+import hashlib
+import time
+import uuid
+
+from core.routers import pin_to_primary
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow, Post
+
+VERSION_KEY = 'posts:version:{name}'
+FOLLOWING_KEY = 'posts:following:{user_id}:{version}'
+INDEX = 'index'
+# Названия групп выводятся в профилях и ленте подписок; переименование
+# группы редкое, поэтому оно сбрасывает их все одной версией.
+GROUPS = 'groups'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(user_id):
+    return f'author:{user_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def post_page(post_id):
+    return f'post:{post_id}'
+
+
+def _key(name):
+    return VERSION_KEY.format(name=name)
+
+
+def _new_version():
+    # Время смены версии нужно для Last-Modified: по нему правка или
+    # удаление поста сдвигают дату, хотя новых постов не появилось.
+    return f'{time.time():.6f}-{uuid.uuid4().hex}'
+
+
+def changed_at(version):
+    """Время смены версии в секундах или None для версии без времени."""
+    try:
+        return float(version.split('-', 1)[0])
+    except ValueError:
+        return None
+
+
+def _avoid_lagging_replicas(page_versions):
+    """Читает из основной базы, если версии сменились недавно.
+
+    Реплика могла ещё не получить изменение, и страница, собранная по её
+    данным, легла бы в кеш под новой версией на всё время жизни кеша.
+    """
+    now = time.time()
+    if any(
+        now - (changed_at(version) or 0) < settings.DATABASE_PIN_SECONDS
+        for version in page_versions
+    ):
+        pin_to_primary()
+
+
+def _create_version(key):
+    version = _new_version()
+    if not cache.add(key, version, None):
+        version = cache.get(key, version)
+    return version
+
+
+def get_versions(*names):
+    keys = [_key(name) for name in names]
+    found = cache.get_many(keys)
+    page_versions = [
+        found[key] if key in found else _create_version(key) for key in keys
+    ]
+    _avoid_lagging_replicas(page_versions)
+    return page_versions
+
+
+def get_version(name):
+    return get_versions(name)[0]
+
+
+def combine(*names):
+    """Общая версия нескольких имён: меняется вместе с любой из них."""
+    digest = hashlib.md5()
+    for version in get_versions(*names):
+        digest.update(version.encode())
+    return digest.hexdigest()
+
+
+def author_page(user_id):
+    """Имена версий профиля автора."""
+    return (author_feed(user_id), GROUPS)
+
+
+def _following(user_id):
+    key = FOLLOWING_KEY.format(
+        user_id=user_id, version=get_version(follow_feed(user_id))
+    )
+    author_ids = cache.get(key)
+    if author_ids is None:
+        author_ids = list(
+            Follow.objects.filter(user_id=user_id).order_by('author_id')
+            .values_list('author_id', flat=True)
+        )
+        cache.set(key, author_ids, None)
+    return author_ids
+
+
+def follow_page(user_id):
+    """Имена версий ленты подписок: подписки и версии всех авторов.
+
+    Список авторов кешируется под версией follow_feed, которую меняют
+    подписка и отписка.
+    """
+    return (
+        follow_feed(user_id),
+        GROUPS,
+        *(author_feed(author_id) for author_id in _following(user_id)),
+    )
+
+
+def bump(*names):
+    """Меняет версии сразу и ещё раз после коммита транзакции.
+
+    Страница, собранная между ними по данным до коммита, ляжет в кеш под
+    промежуточной версией и больше не будет прочитана.
+    """
+    def set_versions():
+        version = _new_version()
+        cache.set_many({_key(name): version for name in names}, None)
+
+    set_versions()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(set_versions)
+
+
+def bump_post_pages(post, *group_ids):
+    """Сбрасывает страницу поста, главную, ленты групп и автора."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    bump(
+        INDEX,
+        post_page(post.pk),
+        author_feed(post.author_id),
+        *(group_feed(group_id) for group_id in group_ids),
+    )
+
+
+def bump_group_pages(group_id):
+    """Сбрасывает страницы, где выводятся ссылки на группу."""
+    bump(INDEX, GROUPS, group_feed(group_id))
+
+
+def bump_author_pages(user_id):
+    """Сбрасывает страницы, где выводится имя автора."""
+    group_ids = Post.objects.filter(
+        author_id=user_id, group__isnull=False
+    ).order_by().values_list('group_id', flat=True).distinct()
+    bump(
+        INDEX,
+        author_feed(user_id),
+        *(group_feed(group_id) for group_id in group_ids),
+    )
+
+
+def bump_follow_pages(user_id, author_id):
+    """Сбрасывает ленту подписчика и счётчики подписок в обоих профилях."""
+    bump(follow_feed(user_id), author_feed(user_id), author_feed(author_id))
@@ -1,46 +1,68 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import conditions, search, thumbnails, timeline, versions
+from .counters import FOLLOW_POSTS_COUNT_KEY, cached_count, get_stats
+from .decorators import cache_anonymous_page, conditional_page
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator, FeedPaginator
 
 SHOW_POSTS_COUNT = 10
 
 
-def paginator(posts, request, post_count=SHOW_POSTS_COUNT):
-    paginator = Paginator(posts, post_count)
+def paginator(posts, request, post_count=SHOW_POSTS_COUNT, mode=None,
+              count=None):
+    mode = mode or settings.POSTS_PAGINATION_MODE
+    if mode == 'cursor':
+        paginator = CursorPaginator(posts, post_count)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = FeedPaginator(posts, post_count, count=count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+@cache_anonymous_page(conditions.index)
 def index(request):
+    # Версия читается до подсчёта постов: после недавней записи счёт
+    # должен прийти из основной базы, а не с отстающей реплики.
+    cache_version = versions.get_version(versions.INDEX)
     posts = Post.objects.select_related('author', 'group')
-    page_obj = paginator(posts, request)
+    page_obj = paginator(posts, request, count=cached_count(posts))
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        'cache_version': cache_version,
+        'cache_timeout': settings.POSTS_PAGE_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@conditional_page(conditions.group)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author')
-    page_obj = paginator(posts, request)
+    page_obj = paginator(posts, request, count=group.posts_count)
     template = 'posts/group_list.html'
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': versions.get_version(versions.group_feed(group.pk)),
+        'cache_timeout': settings.POSTS_PAGE_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@cache_anonymous_page(conditions.profile)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
+    # Статистика читается после версии, как счёт постов на главной.
+    cache_version = versions.combine(*versions.author_page(author.pk))
     posts = author.posts.select_related('group')
-    page_obj = paginator(posts, request)
+    page_obj = paginator(posts, request, count=get_stats(author).posts_count)
     following = (
         request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author
@@ -49,15 +71,31 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'cache_version': cache_version,
+        'cache_timeout': settings.POSTS_PAGE_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+def comments_page(post, request):
+    comments = post.comments.select_related('author')
+    paginator = CursorPaginator(
+        comments,
+        settings.POSTS_COMMENTS_PER_PAGE,
+        ordering=('-created', '-pk'),
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@conditional_page(conditions.post)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    get_stats(post.author)
     template = 'posts/post_detail.html'
-    comments = post.comments.all()
+    comments = comments_page(post, request)
     form = CommentForm()
     context = {
         'post': post,
@@ -67,6 +105,36 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@conditional_page(conditions.post)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk', 'text'), pk=post_id)
+    template = 'posts/comments.html'
+    if request.is_ajax():
+        template = 'posts/includes/comment_list.html'
+    context = {
+        'post': post,
+        'comments': comments_page(post, request),
+    }
+    return render(request, template, context)
+
+
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    results = search.SearchResults(query)
+    page_obj = FeedPaginator(
+        results, settings.POSTS_SEARCH_PER_PAGE
+    ).get_page(request.GET.get('page'))
+    page_query = QueryDict(mutable=True)
+    page_query['q'] = query
+    template = 'posts/search.html'
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': page_query.urlencode() + '&',
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -78,6 +146,7 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        thumbnails.schedule(new_post)
         return redirect('posts:profile', request.user)
 
     context = {
@@ -101,7 +170,14 @@ def post_edit(request, post_id):
     )
 
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        image_changed = 'image' in form.changed_data
+        if image_changed:
+            post.thumbnails = ''
+            post.image_variants = ''
+        post.save()
+        if image_changed:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post.pk)
 
     context = {
@@ -127,10 +203,26 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(posts, request)
+    cache_version = versions.combine(
+        *versions.follow_page(request.user.pk)
+    )
+    posts = timeline.follow_posts(request.user).select_related(
+        'author', 'group'
+    )
+    page_obj = paginator(
+        posts,
+        request,
+        count=cached_count(
+            posts,
+            FOLLOW_POSTS_COUNT_KEY.format(
+                user_id=request.user.pk, version=cache_version
+            ),
+        ),
+    )
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'cache_version': cache_version,
+        'cache_timeout': settings.POSTS_FOLLOW_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
@@ -139,12 +231,12 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        Follow.objects.follow(request.user, author)
     return redirect("posts:profile", username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        user=request.user, author__username=username).delete()
+    author = get_object_or_404(User, username=username)
+    Follow.objects.unfollow(request.user, author)
     return redirect("posts:profile", username=username)
@@ -1,7 +1,11 @@
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core import media
 
 handler403 = 'core.views.permission_denied'
 handler404 = 'core.views.page_not_found'
@@ -22,3 +26,16 @@ if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+else:
+    urlpatterns += (
+        re_path(
+            r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            media.serve,
+            name='media',
+        ),
+        re_path(
+            r'^%s(?P<path>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+            media.serve_static,
+            name='static',
+        ),
+    )